@@ -1,24 +1,152 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from streamlit_folium import st_folium
 import folium
 import json
+import os
+import time
 import openai
 import streamlit as st
 
 from data_loader import (
     load_sensor_readings,
     load_disaster_events,
+    load_social_media,
     load_city_map
 )
 from utils.fake_news_utils import detect_fake_news, extract_sensor_disasters
 
 from utils.zone_mapper import assign_zones_to_sensors_knn
+from utils.facility_index import get_facility_index, nearest_facility_distances
 from utils.anomaly_detector import detect_zscore_anomalies
 from utils.zone_features import generate_zone_sensor_features
+from utils.cache_utils import cached
+from utils import profiling
+from utils.map_layers import build_event_layer, add_event_layer
+from utils.tweet_view import TweetQueryView, STATUS_OPTIONS
+from utils.charts import (
+    count_bar_chart, donut_chart, stacked_bar_chart, date_histogram, heatmap_chart,
+    series_bar_chart, trend_chart, share_pie_chart, box_chart
+)
+from utils.disaster_cube import build_disaster_cube, slice_cube, cube_totals, events_by, monthly_by_type, loss_by_type
+from data_loader import data_version, DATA_DIR
+from modules.stream_runner import StreamState, STREAM_STATE_PATH
 import matplotlib as mpl
+from matplotlib.cbook import boxplot_stats
+
+
+# Cached loaders and analysis steps, shared across sessions. Loaders are keyed
+# by the data files' size/mtime, analysis steps by the fingerprint of their
+# input frames plus parameters, so widget-only reruns skip the recompute.
+def _files_version(columns=None, data_dir=DATA_DIR):
+    return data_version(data_dir)
+
+CACHE_TTL_SECONDS = 3600
+load_sensor_readings = cached(max_entries=8, max_bytes=256 * 2**20, ttl=CACHE_TTL_SECONDS, version=_files_version)(load_sensor_readings)
+load_disaster_events = cached(max_entries=8, max_bytes=256 * 2**20, ttl=CACHE_TTL_SECONDS, version=_files_version)(load_disaster_events)
+load_social_media = cached(max_entries=4, max_bytes=256 * 2**20, ttl=CACHE_TTL_SECONDS, version=_files_version)(load_social_media)
+assign_zones_to_sensors_knn = cached(max_entries=4, max_bytes=128 * 2**20, ttl=CACHE_TTL_SECONDS)(assign_zones_to_sensors_knn)
+detect_zscore_anomalies = cached(max_entries=4, max_bytes=128 * 2**20, ttl=CACHE_TTL_SECONDS)(detect_zscore_anomalies)
+generate_zone_sensor_features = cached(max_entries=8, max_bytes=16 * 2**20, ttl=CACHE_TTL_SECONDS)(generate_zone_sensor_features)
+extract_sensor_disasters = cached(max_entries=4, max_bytes=128 * 2**20, ttl=CACHE_TTL_SECONDS)(extract_sensor_disasters)
+detect_fake_news = cached(max_entries=4, max_bytes=256 * 2**20, ttl=CACHE_TTL_SECONDS)(detect_fake_news)
+
+
+@cached(max_entries=64, max_bytes=128 * 2**20, ttl=CACHE_TTL_SECONDS, version=lambda *args: data_version())
+def disaster_map_layer(year, disaster_type, mode):
+    # One map layer per (year, type, mode) selection, rebuilt only when the data changes
+    disaster_df = load_disaster_events(columns=['date', 'latitude', 'longitude', 'disaster_type', 'location', 'severity'])
+    disaster_df = disaster_df.dropna(subset=['latitude', 'longitude'])
+    filtered = disaster_df[
+        (disaster_df['date'].dt.year == year) &
+        (disaster_df['disaster_type'] == disaster_type)
+    ].copy()
+    if filtered.empty:
+        return None
+    filtered['severity'] = filtered['severity'].fillna(5).astype(int)
+    return build_event_layer(filtered, mode)
+
+
+@cached(max_entries=2, max_bytes=32 * 2**20, ttl=CACHE_TTL_SECONDS, version=lambda: data_version())
+def disaster_cube():
+    # Year x month x type x zone x severity aggregates behind the Disaster Explorer
+    return build_disaster_cube(load_disaster_events(
+        columns=['date', 'disaster_type', 'location', 'severity', 'casualties', 'economic_loss_million_usd']))
+
+
+@cached(max_entries=2, max_bytes=16 * 2**20, ttl=CACHE_TTL_SECONDS, version=lambda: data_version())
+def risk_zone_overview():
+    # Small count tables behind the Risk Zones charts
+    sensor_df = load_sensor_readings(columns=['sensor_type', 'status'])
+    disaster_df = load_disaster_events(columns=['date', 'disaster_type', 'location'])
+    return {
+        "sensor_types": sensor_df['sensor_type'].value_counts(),
+        "sensor_status": sensor_df['status'].value_counts(),
+        "type_status": pd.crosstab(sensor_df['sensor_type'], sensor_df['status']),
+        "disaster_types": disaster_df['disaster_type'].value_counts(),
+        "disaster_zones": disaster_df['location'].value_counts(),
+        "daily_events": disaster_df['date'].dt.floor('D').value_counts().sort_index(),
+        "type_zone": pd.crosstab(disaster_df['disaster_type'], disaster_df['location']),
+    }
+
+
+@cached(max_entries=2, max_bytes=16 * 2**20, ttl=CACHE_TTL_SECONDS, version=lambda: data_version())
+def facility_coverage():
+    # Mean km from each disaster type's events to the nearest facility of each type
+    disaster_df = load_disaster_events(columns=['event_id', 'disaster_type', 'location', 'latitude', 'longitude'])
+    distances = nearest_facility_distances(disaster_df, get_facility_index(load_city_map()))
+    return distances.drop(columns=['event_id', 'location']).groupby('disaster_type').mean().round(2)
+
+
+@cached(max_entries=64, max_bytes=32 * 2**20, ttl=CACHE_TTL_SECONDS, version=lambda *args: data_version())
+def severity_casualty_stats(years, disaster_types, zones):
+    # Box statistics per severity level; a boxplot needs the individual
+    # events, so this reads the raw rows rather than the cube
+    disaster_df = load_disaster_events(columns=['date', 'disaster_type', 'location', 'severity', 'casualties'])
+    filtered_df = disaster_df[
+        (disaster_df['date'].dt.year.isin(years)) &
+        (disaster_df['disaster_type'].isin(disaster_types)) &
+        (disaster_df['location'].isin(zones))
+    ].dropna(subset=['severity', 'casualties'])
+    stats = []
+    for severity, casualties in filtered_df.groupby('severity', observed=True)['casualties']:
+        stats.extend(boxplot_stats(casualties.to_numpy(), labels=[f"{severity:g}"]))
+    return stats
+
+
+def _stream_state_version():
+    return os.path.getmtime(STREAM_STATE_PATH) if os.path.exists(STREAM_STATE_PATH) else None
+
+
+@cached(max_entries=1, max_bytes=256 * 2**20, version=_stream_state_version)
+def stream_state():
+    # Latest state published by modules/stream_runner.py, reloaded when the file changes
+    if not os.path.exists(STREAM_STATE_PATH):
+        return None
+    return StreamState.load(STREAM_STATE_PATH)
+
+
+ESSENTIAL_DATA_DIR = "data/essential_data"
+
+
+@cached(max_entries=2, max_bytes=512 * 2**20, ttl=CACHE_TTL_SECONDS,
+        version=lambda: (data_version(), data_version(ESSENTIAL_DATA_DIR)))
+def fake_news_view():
+    # Classified tweets behind a pre-sorted, pre-masked query view; widget
+    # changes only page through it.
+    sensor_df = load_sensor_readings(columns=['timestamp', 'latitude', 'longitude', 'sensor_type', 'status'], data_dir=ESSENTIAL_DATA_DIR)
+    disaster_df = load_disaster_events()
+    social_df = load_social_media(data_dir=ESSENTIAL_DATA_DIR)
+
+    # Extract disaster events from sensors
+    sensor_disasters = extract_sensor_disasters(sensor_df)
+
+    # Merge historical and sensor disasters
+    combined_events = pd.concat([disaster_df, sensor_disasters], ignore_index=True)
+
+    # Run fake news detection
+    result_df = detect_fake_news(social_df, combined_events)
+    return TweetQueryView(result_df)
 
 
 # Streamlit settings
@@ -72,362 +200,314 @@ selected_tab = st.sidebar.radio("📂 Choose a View", [
 
 ])
 
+# Per-stage timings (panel at the bottom) are a process-wide setting, since
+# the recorder and tracemalloc are shared by every session: start the app
+# with CRISISVERSE_PROFILE=1 to turn them on.
+run_started = time.time()
+
 # --------------------------------
 # 📍 RISK ZONES TAB
 # --------------------------------
-if selected_tab == "📍 Risk Zones":
-    st.header("📍 Risk Zones – Sensor & Disaster Overview")
+with profiling.stage(f"tab {selected_tab}"):
+    if selected_tab == "📍 Risk Zones":
+        st.header("📍 Risk Zones – Sensor & Disaster Overview")
 
-    sensor_df = load_sensor_readings()
-    sensor_df['timestamp'] = pd.to_datetime(sensor_df['timestamp'])
-    disaster_df = load_disaster_events()
-    disaster_df['date'] = pd.to_datetime(disaster_df['date'])
-
-    st.markdown("### 🛰️ Sensor Network Overview")
-    col1, col2 = st.columns(2)
-
-    with col1:
-        fig1, ax1 = plt.subplots(figsize=(6, 4))
-        sns.countplot(data=sensor_df, x='sensor_type', order=sensor_df['sensor_type'].value_counts().index, palette='viridis', ax=ax1)
-        ax1.set_title("Sensor Count by Type")
-        ax1.set_xlabel("Sensor Type")
-        ax1.set_ylabel("Count")
-        ax1.tick_params(axis='x', rotation=45)
-        st.pyplot(fig1)
-
-    with col2:
-        status_counts = sensor_df['status'].value_counts()
-        labels = [f"{label} ({val})" for label, val in zip(status_counts.index, status_counts.values)]
-        sizes = status_counts.values
-        colors = sns.color_palette('pastel')[:len(labels)]
-        explode = [0.04] * len(labels)
-
-        fig2, ax2 = plt.subplots(figsize=(5, 5))
-        wedges, texts, autotexts = ax2.pie(
-            sizes, labels=labels, autopct='%1.1f%%', startangle=90, explode=explode,
-            shadow=False, colors=colors, textprops={'fontsize': 9}
-        )
-        centre_circle = plt.Circle((0, 0), 0.65, fc='white')
-        fig2.gca().add_artist(centre_circle)
-        ax2.set_title("Sensor Status", fontsize=12, weight='bold')
-        st.pyplot(fig2)
-
-    st.markdown("### 🧮 Sensor Health Summary")
-    with st.expander("See Stacked Bar Chart of Sensor Type vs Status"):
-        pivot = pd.crosstab(sensor_df['sensor_type'], sensor_df['status'])
-        fig3, ax3 = plt.subplots(figsize=(4, 2))
-        pivot.plot(kind='bar', stacked=True, colormap='Set2', ax=ax3)
-        ax3.set_title("Sensor Type vs Status Distribution")
-        ax3.set_xlabel("Sensor Type")
-        ax3.set_ylabel("Count")
-        ax3.tick_params(axis='x', rotation=45)
-        st.pyplot(fig3)
-
-    st.markdown("---")
-    st.markdown("### 🌊 Disaster Event Insights")
-
-    col3, col4 = st.columns(2)
-
-    with col3:
-        fig4, ax4 = plt.subplots(figsize=(4, 2))
-        sns.countplot(data=disaster_df, x='disaster_type', order=disaster_df['disaster_type'].value_counts().index, palette='flare', ax=ax4)
-        ax4.set_title("Disaster Count by Type")
-        ax4.set_xlabel("Disaster Type")
-        ax4.set_ylabel("Count")
-        ax4.tick_params(axis='x', rotation=45)
-        st.pyplot(fig4)
-
-    with col4:
-        fig5, ax5 = plt.subplots(figsize=(4, 2))
-        sns.countplot(data=disaster_df, x='location', order=disaster_df['location'].value_counts().index, palette='crest', ax=ax5)
-        ax5.set_title("Disasters by Zone")
-        ax5.set_xlabel("Zone")
-        ax5.set_ylabel("Count")
-        st.pyplot(fig5)
-
-    st.markdown("### ⏳ Temporal & Heatmap Patterns")
-    with st.expander("📅 Temporal Distribution & Heatmap"):
-        fig6, ax6 = plt.subplots(figsize=(7, 1))
-        sns.histplot(disaster_df['date'], bins=60, kde=True, color='darkred', ax=ax6)
-        ax6.set_title("Disaster Events Over Time")
-        ax6.set_xlabel("Date")
-        ax6.set_ylabel("Count")
-        st.pyplot(fig6)
-
-        type_zone = pd.crosstab(disaster_df['disaster_type'], disaster_df['location'])
-        fig7, ax7 = plt.subplots(figsize=(4, 2))
-        sns.heatmap(type_zone, annot=True, cmap='YlOrBr', fmt='d', ax=ax7)
-        ax7.set_title("Disaster Type vs Zone")
-        st.pyplot(fig7)
-
-    st.markdown("### 🧠 Key Insights")
+        overview = risk_zone_overview()
+
+        st.markdown("### 🛰️ Sensor Network Overview")
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.image(count_bar_chart(overview["sensor_types"], "Sensor Count by Type", "Sensor Type",
+                                     palette='viridis', figsize=(6, 4), rotation=45), width="stretch")
+
+        with col2:
+            st.image(donut_chart(overview["sensor_status"], "Sensor Status"), width="stretch")
+
+        st.markdown("### 🧮 Sensor Health Summary")
+        with st.expander("See Stacked Bar Chart of Sensor Type vs Status"):
+            st.image(stacked_bar_chart(overview["type_status"], "Sensor Type vs Status Distribution", "Sensor Type"),
+                     width="stretch")
+
+        st.markdown("---")
+        st.markdown("### 🌊 Disaster Event Insights")
+
+        col3, col4 = st.columns(2)
+
+        with col3:
+            st.image(count_bar_chart(overview["disaster_types"], "Disaster Count by Type", "Disaster Type",
+                                     palette='flare', rotation=45), width="stretch")
+
+        with col4:
+            st.image(count_bar_chart(overview["disaster_zones"], "Disasters by Zone", "Zone", palette='crest'),
+                     width="stretch")
+
+        st.markdown("### ⏳ Temporal & Heatmap Patterns")
+        with st.expander("📅 Temporal Distribution & Heatmap"):
+            st.image(date_histogram(overview["daily_events"], "Disaster Events Over Time"), width="stretch")
+            st.image(heatmap_chart(overview["type_zone"], "Disaster Type vs Zone"), width="stretch")
+
+        st.markdown("### 🧠 Key Insights")
     
-elif selected_tab == "📊 Zone Intelligence":
-    st.header("📊 Zone Intelligence")
+    elif selected_tab == "📊 Zone Intelligence":
+        st.header("📊 Zone Intelligence")
+
+        # Load and prepare data
+        sensor_df = load_sensor_readings(columns=['timestamp', 'latitude', 'longitude', 'sensor_type', 'reading_value'])
+        disaster_df = load_disaster_events(columns=['latitude', 'longitude', 'location'])
+
+        # Assign zones via KNN and detect anomalies
+        sensor_df = assign_zones_to_sensors_knn(sensor_df, disaster_df)
+        sensor_df = detect_zscore_anomalies(sensor_df)
+
+        # Generate zone-level features
+        zone_feature_df = generate_zone_sensor_features(sensor_df)
+        zone_feature_df["name"] = zone_feature_df["zone_id"]
+
+        # Classify zones based on anomaly count
+        zone_feature_df["risk_level"] = pd.cut(
+            zone_feature_df["anomaly_count"],
+            bins=[-1, 50, 100, 150, float("inf")],
+            labels=["Low", "Moderate", "High", "Critical"]
+        )
 
-    # Load and prepare data
-    sensor_df = load_sensor_readings()
-    sensor_df['timestamp'] = pd.to_datetime(sensor_df['timestamp'])
-    disaster_df = load_disaster_events()
-    disaster_df['date'] = pd.to_datetime(disaster_df['date'])
-
-    # Assign zones via KNN and detect anomalies
-    sensor_df = assign_zones_to_sensors_knn(sensor_df, disaster_df)
-    sensor_df = detect_zscore_anomalies(sensor_df)
-
-    # Generate zone-level features
-    zone_feature_df = generate_zone_sensor_features(sensor_df)
-    zone_feature_df["name"] = zone_feature_df["zone_id"]
-
-    # Classify zones based on anomaly count
-    zone_feature_df["risk_level"] = pd.cut(
-        zone_feature_df["anomaly_count"],
-        bins=[-1, 50, 100, 150, float("inf")],
-        labels=["Low", "Moderate", "High", "Critical"]
-    )
-
-    # Show top risky zones
-    st.markdown("### 🚨 Top Risky Zones")
-    st.dataframe(zone_feature_df.sort_values("anomaly_count", ascending=False).head(5))
-
-    # Load GeoJSON
-    with open("data/city_map.geojson", "r") as f:
-        city_map = json.load(f)
-
-    # st.markdown("### 🗺️ Zone Intelligence Map")
-
-    # # Create map
-    # m = folium.Map(location=[37.77, -122.42], zoom_start=12)
-
-    # # Choropleth by anomaly count
-    # folium.Choropleth(
-    #     geo_data=city_map,
-    #     name="Anomaly Map",
-    #     data=zone_feature_df,
-    #     columns=["name", "anomaly_count"],
-    #     key_on="feature.properties.name",
-    #     fill_color="YlOrRd",
-    #     fill_opacity=0.7,
-    #     line_opacity=0.2,
-    #     legend_name="Anomaly Count by Zone",
-    #     highlight=True,
-    # ).add_to(m)
-
-    # # Tooltip for each zone
-    # folium.GeoJson(
-    #     data=city_map,
-    #     name="Interactive Zones",
-    #     tooltip=folium.GeoJsonTooltip(
-    #         fields=["name"],
-    #         aliases=["Zone"],
-    #         sticky=True,
-    #         labels=True,
-    #         style="background-color: white; font-size: 12px; padding: 5px;"
-    #     ),
-    # ).add_to(m)
-
-    # st_folium(m, width=950, height=550)
-elif selected_tab == "📈 Crisis Timeline":
-    st.header("📈 Crisis Timeline")
-    st.info("This section will show cascading disasters and sensor alerts over time.")
-elif selected_tab == "📌 Disaster Explorer":
-    st.header("📌 Disaster Explorer – Interactive EDA Dashboard")
-
-    # Load and prepare data
-    disaster_df = load_disaster_events()
-    disaster_df['date'] = pd.to_datetime(disaster_df['date'])
-    disaster_df['year'] = disaster_df['date'].dt.year
-    disaster_df['month'] = disaster_df['date'].dt.month
-
-    # 🎛️ Filters (inside main page)
-    st.subheader("🎛️ Filter Disasters")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        selected_year = st.multiselect("Select Year(s)", sorted(disaster_df['year'].unique()), default=sorted(disaster_df['year'].unique()))
-    with col2:
-        selected_type = st.multiselect("Select Disaster Type(s)", disaster_df['disaster_type'].unique(), default=disaster_df['disaster_type'].unique())
-    with col3:
-        selected_zone = st.multiselect("Select Zone(s)", disaster_df['location'].unique(), default=disaster_df['location'].unique())
-
-    # Filter application
-    filtered_df = disaster_df[
-        (disaster_df['year'].isin(selected_year)) &
-        (disaster_df['disaster_type'].isin(selected_type)) &
-        (disaster_df['location'].isin(selected_zone))
-    ]
-
-    # Handle empty results
-    if filtered_df.empty:
-        st.warning("⚠️ No data matches the selected filters. Please update your selections to view the dashboard.")
-    else:
-        # 📊 Overview KPIs
-        st.subheader("📊 Key Metrics")
+        # Show top risky zones
+        st.markdown("### 🚨 Top Risky Zones")
+        st.dataframe(zone_feature_df.sort_values("anomaly_count", ascending=False).head(5))
+
+        # Live results from the streaming runner, when one has published
+        state = stream_state()
+        if state is not None:
+            st.markdown("### 📡 Live Stream")
+            if state.updated_at is not None:
+                st.caption(f"Last update: {state.updated_at:%Y-%m-%d %H:%M:%S}")
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Readings Ingested", f"{state.store.rows_seen:,}")
+            col2.metric("Verified Tweets", f"{state.tweet_totals['verified']:,}")
+            col3.metric("Potential Fake Tweets", f"{state.tweet_totals['potential_fake']:,}")
+
+            st.dataframe(state.store.hourly().sort_values("hour", ascending=False).head(50))
+            with st.expander("Recent Anomalies"):
+                st.dataframe(state.recent_anomalies.iloc[::-1])
+            with st.expander("Pipeline Metrics"):
+                st.dataframe(state.metrics)
+
+        st.markdown("### 🏥 Distance to Critical Facilities")
+        st.caption("Mean km from each type of disaster event to the nearest facility of each type")
+        st.dataframe(facility_coverage())
+
+        # Load GeoJSON
+        with open("data/city_map.geojson", "r") as f:
+            city_map = json.load(f)
+
+        # st.markdown("### 🗺️ Zone Intelligence Map")
+
+        # # Create map
+        # m = folium.Map(location=[37.77, -122.42], zoom_start=12)
+
+        # # Choropleth by anomaly count
+        # folium.Choropleth(
+        #     geo_data=city_map,
+        #     name="Anomaly Map",
+        #     data=zone_feature_df,
+        #     columns=["name", "anomaly_count"],
+        #     key_on="feature.properties.name",
+        #     fill_color="YlOrRd",
+        #     fill_opacity=0.7,
+        #     line_opacity=0.2,
+        #     legend_name="Anomaly Count by Zone",
+        #     highlight=True,
+        # ).add_to(m)
+
+        # # Tooltip for each zone
+        # folium.GeoJson(
+        #     data=city_map,
+        #     name="Interactive Zones",
+        #     tooltip=folium.GeoJsonTooltip(
+        #         fields=["name"],
+        #         aliases=["Zone"],
+        #         sticky=True,
+        #         labels=True,
+        #         style="background-color: white; font-size: 12px; padding: 5px;"
+        #     ),
+        # ).add_to(m)
+
+        # st_folium(m, width=950, height=550)
+    elif selected_tab == "📈 Crisis Timeline":
+        st.header("📈 Crisis Timeline")
+        st.info("This section will show cascading disasters and sensor alerts over time.")
+    elif selected_tab == "📌 Disaster Explorer":
+        st.header("📌 Disaster Explorer – Interactive EDA Dashboard")
+
+        # Pre-aggregated cube; filters and charts only touch its cells
+        cube = disaster_cube()
+
+        # 🎛️ Filters (inside main page)
+        st.subheader("🎛️ Filter Disasters")
         col1, col2, col3 = st.columns(3)
-        col1.metric("Total Events", len(filtered_df))
-        col2.metric("Total Casualties", int(filtered_df['casualties'].sum()))
-        col3.metric("Economic Loss (M)", f"${int(filtered_df['economic_loss_million_usd'].sum()):,}")
-
-        st.divider()
-
-        # 📅 Events per Year
-        st.subheader("📅 Yearly Event Count")
-        fig1, ax1 = plt.subplots(figsize=(4, 2))
-        filtered_df.groupby("year").size().plot(kind="bar", ax=ax1, color='skyblue')
-        ax1.set_ylabel("Event Count", fontsize=9)
-        ax1.set_title("Events per Year", fontsize=11)
-        ax1.tick_params(axis='x', labelsize=8)
-        st.pyplot(fig1)
-        st.divider()
-
-        # 📈 Monthly Trends
-        st.subheader("📈 Monthly Trends by Disaster Type")
-        monthly = filtered_df.groupby(['month', 'disaster_type']).size().unstack().fillna(0)
-        fig2, ax2 = plt.subplots(figsize=(5, 1))
-        monthly.plot(ax=ax2)
-        ax2.set_title("Seasonal Trends", fontsize=11)
-        ax2.set_xlabel("Month", fontsize=9)
-        ax2.set_ylabel("Count", fontsize=9)
-        ax2.legend(fontsize=7)
-        st.pyplot(fig2)
-        st.divider()
-
-        # 🌪️ Disaster Type Pie
-        st.subheader("🌪️ Disaster Type Distribution")
-        fig3, ax3 = plt.subplots(figsize=(2, 2))
-        filtered_df['disaster_type'].value_counts().plot.pie(
-            autopct='%1.1f%%', startangle=90, shadow=False, ax=ax3
-        )
-        ax3.set_ylabel("")
-        ax3.set_title("Share by Type", fontsize=11)
-        st.pyplot(fig3)
-        st.divider()
-
-        # 📍 Events by Zone
-        st.subheader("📍 Disaster Events by Zone")
-        fig4, ax4 = plt.subplots(figsize=(4, 2))
-        sns.countplot(data=filtered_df, x='location', palette='Set2', ax=ax4)
-        ax4.set_title("Disasters by Zone", fontsize=11)
-        ax4.tick_params(axis='x', labelsize=9)
-        st.pyplot(fig4)
-        st.divider()
-
-        # 💥 Severity vs Casualties
-        with st.expander("💥 Severity vs Casualties"):
-            fig5, ax5 = plt.subplots(figsize=(7, 3))
-            sns.boxplot(data=filtered_df, x="severity", y="casualties", ax=ax5)
-            ax5.set_title("Casualties Across Severity Levels", fontsize=11)
-            st.pyplot(fig5)
-        st.divider()
-
-        # 💸 Economic Loss by Type
-        with st.expander("💸 Economic Loss by Disaster Type"):
-            econ = filtered_df.groupby("disaster_type")["economic_loss_million_usd"].sum().sort_values(ascending=False)
-            fig6, ax6 = plt.subplots(figsize=(4, 2))
-            econ.plot(kind="bar", ax=ax6, color='orange')
-            ax6.set_ylabel("Total Loss (M USD)", fontsize=9)
-            ax6.set_title("Economic Loss by Disaster Type", fontsize=11)
-            st.pyplot(fig6)
-        st.divider()
-
-        # 📊 Avg Loss Table
-        st.subheader("📊 Avg Economic Loss per Event")
-        avg_loss = filtered_df.groupby("disaster_type")["economic_loss_million_usd"].mean().round(2)
-        st.dataframe(avg_loss.reset_index().rename(columns={"economic_loss_million_usd": "Avg Loss (M)"}))
-elif selected_tab == "🌍 Disaster Event Map":
-    st.header("🌍 Disaster Risk Map (Color-Coded by Severity)")
-
-    # Load and validate disaster data
-    disaster_df = load_disaster_events()
-    disaster_df['date'] = pd.to_datetime(disaster_df['date'], errors='coerce')
-    disaster_df = disaster_df.dropna(subset=['latitude', 'longitude'])
+        with col1:
+            year_options = sorted(cube['year'].dropna().unique())
+            selected_year = st.multiselect("Select Year(s)", year_options, default=year_options)
+        with col2:
+            type_options = cube['disaster_type'].dropna().unique().tolist()
+            selected_type = st.multiselect("Select Disaster Type(s)", type_options, default=type_options)
+        with col3:
+            zone_options = cube['location'].dropna().unique().tolist()
+            selected_zone = st.multiselect("Select Zone(s)", zone_options, default=zone_options)
+
+        # Filter application
+        cells = slice_cube(cube, selected_year, selected_type, selected_zone)
+
+        # Handle empty results
+        if cells.empty:
+            st.warning("⚠️ No data matches the selected filters. Please update your selections to view the dashboard.")
+        else:
+            # 📊 Overview KPIs
+            st.subheader("📊 Key Metrics")
+            totals = cube_totals(cells)
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Total Events", totals["events"])
+            col2.metric("Total Casualties", int(totals["casualties"]))
+            col3.metric("Economic Loss (M)", f"${int(totals['economic_loss']):,}")
+
+            st.divider()
+
+            # 📅 Events per Year
+            st.subheader("📅 Yearly Event Count")
+            st.image(series_bar_chart(events_by(cells, "year").sort_index(), "Events per Year", "Event Count", 'skyblue'),
+                     width="stretch")
+            st.divider()
+
+            # 📈 Monthly Trends
+            st.subheader("📈 Monthly Trends by Disaster Type")
+            st.image(trend_chart(monthly_by_type(cells), "Seasonal Trends", "Month"), width="stretch")
+            st.divider()
+
+            # 🌪️ Disaster Type Pie
+            st.subheader("🌪️ Disaster Type Distribution")
+            st.image(share_pie_chart(events_by(cells, "disaster_type"), "Share by Type"), width="stretch")
+            st.divider()
+
+            # 📍 Events by Zone
+            st.subheader("📍 Disaster Events by Zone")
+            st.image(count_bar_chart(events_by(cells, "location").sort_index(), "Disasters by Zone", "location",
+                                     ylabel="count", palette='Set2', title_size=11, label_size=9), width="stretch")
+            st.divider()
+
+            # 💥 Severity vs Casualties
+            with st.expander("💥 Severity vs Casualties"):
+                stats = severity_casualty_stats(selected_year, selected_type, selected_zone)
+                st.image(box_chart(stats, "Casualties Across Severity Levels", "severity", "casualties"), width="stretch")
+            st.divider()
+
+            losses = loss_by_type(cells)
+
+            # 💸 Economic Loss by Type
+            with st.expander("💸 Economic Loss by Disaster Type"):
+                econ = losses["total_loss"].sort_values(ascending=False)
+                st.image(series_bar_chart(econ, "Economic Loss by Disaster Type", "Total Loss (M USD)", 'orange'),
+                         width="stretch")
+            st.divider()
+
+            # 📊 Avg Loss Table
+            st.subheader("📊 Avg Economic Loss per Event")
+            avg_loss = losses["avg_loss"].round(2).rename("economic_loss_million_usd")
+            st.dataframe(avg_loss.reset_index().rename(columns={"economic_loss_million_usd": "Avg Loss (M)"}))
+    elif selected_tab == "🌍 Disaster Event Map":
+        st.header("🌍 Disaster Risk Map (Color-Coded by Severity)")
+
+        # Load and validate disaster data
+        disaster_df = load_disaster_events(columns=['date', 'latitude', 'longitude', 'disaster_type', 'location', 'severity'])
+        disaster_df = disaster_df.dropna(subset=['latitude', 'longitude'])
+
+        if disaster_df.empty:
+            st.warning("⚠️ Disaster dataset appears to be empty.")
+        else:
+            disaster_df['year'] = disaster_df['date'].dt.year
+
+            # Sidebar Filters
+            selected_year = st.selectbox("Select Year", sorted(disaster_df['year'].dropna().unique(), reverse=True))
+            selected_type = st.selectbox("Select Disaster Type", sorted(disaster_df['disaster_type'].dropna().unique()))
+
+            render_mode = st.radio("Rendering", ["Auto", "Points", "Grid"], horizontal=True,
+                                   help="Auto shows individual events for small selections and a severity grid for large ones.")
+
+            layer = disaster_map_layer(int(selected_year), selected_type, render_mode)
 
-    if disaster_df.empty:
-        st.warning("⚠️ Disaster dataset appears to be empty.")
-    else:
-        disaster_df['year'] = disaster_df['date'].dt.year
-        disaster_df['severity'] = disaster_df['severity'].fillna(5).astype(int)
+            if layer is None:
+                st.warning("⚠️ No records found for selected year and disaster type.")
+            else:
+                m = folium.Map(location=layer["center"], zoom_start=11)
+                add_event_layer(m, layer)
 
-        # Sidebar Filters
-        selected_year = st.selectbox("Select Year", sorted(disaster_df['year'].dropna().unique(), reverse=True))
-        selected_type = st.selectbox("Select Disaster Type", sorted(disaster_df['disaster_type'].dropna().unique()))
+                if layer["kind"] == "grid":
+                    st.markdown(f"Showing {layer['events']} events as grid cells colored by their highest severity.")
+                st.markdown("🟢 Green = Low | 🟠 Medium | 🔴 High Severity")
+                st_folium(m, width=950, height=550)
+    elif selected_tab == "📰 Fake News Detection":
+        st.header("📰 Early Warnings & Misinformation Detection")
 
-        filtered = disaster_df[
-            (disaster_df['year'] == selected_year) &
-            (disaster_df['disaster_type'] == selected_type)
-        ]
+        view = fake_news_view()
 
-        if filtered.empty:
-            st.warning("⚠️ No records found for selected year and disaster type.")
+        # Toggle filters
+        st.markdown("### 🕵️ Tweet Classification")
+        filter_option = st.radio("Choose tweets to view:", STATUS_OPTIONS, horizontal=True)
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            selected_types = st.multiselect("Disaster type(s)", view.disaster_types, default=view.disaster_types)
+        with col2:
+            first_day, last_day = view.time_range
+            date_range = st.date_input("Date range", value=(first_day.date(), last_day.date()),
+                                       min_value=first_day.date(), max_value=last_day.date())
+        with col3:
+            newest_first = st.toggle("Newest first", value=True)
+            page_size = st.selectbox("Rows per page", [100, 200, 500], index=1)
+
+        # date_input returns a 1-tuple while the user is still picking the end date
+        if isinstance(date_range, tuple):
+            start, end = (date_range[0], date_range[-1]) if date_range else (first_day.date(), last_day.date())
         else:
-            # Severity color palette
-            severity_color = {
-                1: "green", 2: "green", 3: "green",
-                4: "orange", 5: "orange", 6: "orange",
-                7: "red", 8: "red", 9: "red"
-            }
-
-            m = folium.Map(
-                location=[filtered['latitude'].mean(), filtered['longitude'].mean()],
-                zoom_start=11
-            )
-
-            for _, row in filtered.iterrows():
-                folium.CircleMarker(
-                    location=[row['latitude'], row['longitude']],
-                    radius=6,
-                    color=severity_color.get(int(row['severity']), "gray"),
-                    fill=True,
-                    fill_opacity=0.8,
-                    popup=folium.Popup(
-                        f"<b>{row['disaster_type']}</b><br>"
-                        f"Zone: {row['location']}<br>"
-                        f"Date: {row['date'].date()}<br>"
-                        f"Severity: {row['severity']}",
-                        max_width=250
-                    )
-                ).add_to(m)
-
-            st.markdown("🟢 Green = Low | 🟠 Medium | 🔴 High Severity")
-            st_folium(m, width=950, height=550)
-elif selected_tab == "📰 Fake News Detection":
-    st.header("📰 Early Warnings & Misinformation Detection")
-
-    # Load data
-    sensor_df = pd.read_csv("data/essential_data/sensor_readings.csv")
-    disaster_df = pd.read_csv("data/disaster_events.csv")
-    social_df = pd.read_csv("data/essential_data/social_media_stream.csv")
-
-    # Ensure datetime parsing
-    sensor_df['timestamp'] = pd.to_datetime(sensor_df['timestamp'])
-    disaster_df['date'] = pd.to_datetime(disaster_df['date'])
-    social_df['timestamp'] = pd.to_datetime(social_df['timestamp'])
+            start = end = date_range
+        # The full range means no time filter, so tweets without a timestamp stay listed
+        if start <= first_day.date() and end >= last_day.date():
+            start = end = None
+        else:
+            end = pd.Timestamp(end) + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+        filters = dict(status=filter_option, disaster_types=selected_types, start=start, end=end)
 
-    # Extract disaster events from sensors
-    from utils.fake_news_utils import detect_fake_news, extract_sensor_disasters
-    sensor_disasters = extract_sensor_disasters(sensor_df)
+        _, total = view.query(**filters, page_size=0)
+        n_pages = max((total + page_size - 1) // page_size, 1)
+        page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1)
+        page_df, total = view.query(**filters, ascending=not newest_first, page=page, page_size=page_size)
 
-    # Merge historical and sensor disasters
-    combined_events = pd.concat([disaster_df, sensor_disasters], ignore_index=True)
+        first_row = (page - 1) * page_size + 1 if total else 0
+        last_row = first_row + len(page_df) - 1 if total else 0
+        st.markdown(f"### 📢 Showing {first_row}–{last_row} of {total} tweets")
+        st.dataframe(page_df, width="stretch")
 
-    # Run fake news detection
-    result_df = detect_fake_news(social_df, combined_events)
+        st.info("""
+        • ✅ Verified = Tweet matched to a real disaster (location & time window)
+        • ⚠️ Potential Fake = No match to real disaster event
+        • Uses both sensor and reported event datasets for validation
+        """)
 
-    # Toggle filters
-    st.markdown("### 🕵️ Tweet Classification")
-    filter_option = st.radio("Choose tweets to view:", ["All", "Verified", "Potential Fake"])
-
-    if filter_option == "Verified":
-        display_df = result_df[result_df["is_verified_event"]]
-    elif filter_option == "Potential Fake":
-        display_df = result_df[result_df["is_potential_fake"]]
-    else:
-        display_df = result_df
-
-    st.markdown(f"### 📢 Showing {len(display_df)} tweets")
-    st.dataframe(display_df[["timestamp", "text", "latitude", "longitude", "detected_disaster_type", "is_verified_event"]].sort_values("timestamp", ascending=False), use_container_width=True)
-
-    st.info("""
-    • ✅ Verified = Tweet matched to a real disaster (location & time window)
-    • ⚠️ Potential Fake = No match to real disaster event
-    • Uses both sensor and reported event datasets for validation
-    """)
+# --------------------------------
+# 🛠️ PROFILING PANEL
+# --------------------------------
+if profiling.is_enabled():
+    with st.expander("🛠️ Profiling"):
+        st.markdown("**This run**")
+        st.dataframe(profiling.records(since=run_started).drop(columns="started_at"), width="stretch")
+        st.markdown("**Totals for this process**")
+        st.dataframe(profiling.summary(), width="stretch")
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.download_button("⬇️ JSON lines", profiling.to_jsonl(), file_name="profile.jsonl")
+        col2.download_button("⬇️ Prometheus", profiling.to_prometheus(), file_name="profile.prom")
+        if col3.button("💾 Export to data/.cache"):
+            profiling.export_jsonl()
+            profiling.export_prometheus()
+            st.success(f"Wrote {profiling.PROFILE_JSONL_PATH} and {profiling.PROFILE_PROM_PATH}")
+        if col4.button("🧹 Clear"):
+            profiling.clear()
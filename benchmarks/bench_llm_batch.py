@@ -0,0 +1,55 @@
+# benchmarks/bench_llm_batch.py
+#
+# Measures summarize_zone_stats_batch against the local stub server:
+# sequential baseline vs. concurrent batch, then a fully cached rerun.
+#     python -m benchmarks.bench_llm_batch --zones 10 --hours 24 --latency 0.2
+
+import argparse
+import os
+import tempfile
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+from modules.openai_utils import summarize_zone_stats_batch
+from benchmarks.stub_llm_server import start_stub_server
+
+
+def make_items(n_zones, n_hours):
+    return [
+        (f"Zone {z}", hour, 20.0 + z, 35.0 + hour / 2, 10 + z, "temp")
+        for z in range(n_zones) for hour in range(n_hours)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched zone summaries")
+    parser.add_argument("--zones", type=int, default=10)
+    parser.add_argument("--hours", type=int, default=24)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rps", type=float, default=None, help="requests-per-second cap")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency=args.latency, error_rate=args.error_rate)
+    items = make_items(args.zones, args.hours)
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            runs = [
+                ("sequential", dict(concurrency=1, cache_dir=None)),
+                ("concurrent (cold)", dict(concurrency=args.concurrency, cache_dir=cache_dir)),
+                ("concurrent (cached)", dict(concurrency=args.concurrency, cache_dir=cache_dir)),
+            ]
+            print(f"{len(items)} summaries, {args.latency:.2f}s stub latency")
+            for label, options in runs:
+                _, stats = summarize_zone_stats_batch(items, base_url=base_url,
+                                                      requests_per_second=args.rps, **options)
+                hit_rate = stats["cache_hits"] / stats["unique"]
+                print(f"{label:>20}: {stats['seconds']:7.2f}s  {stats['requests_per_second']:8.1f} req/s  "
+                      f"api_calls={stats['api_calls']}  retries={stats['retries']}  cache_hit_rate={hit_rate:.0%}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_zone_assignment.py
+#
+# Compares the row-wise assign_zone loop with assign_zones_vectorized.
+# Run from the repository root:
+#     python -m benchmarks.bench_zone_assignment --rows 10000 100000 1000000
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules.data_cleaner import (
+    generate_zone_bounding_boxes,
+    assign_zone,
+    assign_zones_vectorized,
+)
+
+# Bay Area extent used by the bundled datasets
+LAT_RANGE = (37.0, 38.0)
+LON_RANGE = (-122.6, -121.5)
+
+
+def make_disasters(n_events=5000, n_zones=5, seed=0):
+    # Events cluster around one centre per zone, so boxes partly overlap
+    # and the first-match rule actually matters.
+    rng = np.random.default_rng(seed)
+    zone_idx = rng.integers(0, n_zones, n_events)
+    centre_lat = rng.uniform(*LAT_RANGE, n_zones)
+    centre_lon = rng.uniform(*LON_RANGE, n_zones)
+    return pd.DataFrame({
+        "latitude": centre_lat[zone_idx] + rng.normal(0, 0.08, n_events),
+        "longitude": centre_lon[zone_idx] + rng.normal(0, 0.08, n_events),
+        "location": np.array([f"Zone {chr(65 + i)}" for i in range(n_zones)])[zone_idx],
+    })
+
+
+def make_points(n_rows, seed=1):
+    rng = np.random.default_rng(seed)
+    # Pad the extent a little so some points fall outside every box
+    lat = rng.uniform(LAT_RANGE[0] - 0.05, LAT_RANGE[1] + 0.05, n_rows)
+    lon = rng.uniform(LON_RANGE[0] - 0.05, LON_RANGE[1] + 0.05, n_rows)
+    return lat, lon
+
+
+def run_row_wise(lat, lon, bbox_df):
+    df = pd.DataFrame({"latitude": lat, "longitude": lon})
+    return df.apply(lambda row: assign_zone(row["latitude"], row["longitude"], bbox_df), axis=1).to_numpy()
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bounding-box zone assignment")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--zones", type=int, default=5)
+    parser.add_argument("--row-wise-limit", type=int, default=20_000,
+                        help="largest size the row-wise loop is timed on")
+    args = parser.parse_args()
+
+    bbox_df = generate_zone_bounding_boxes(make_disasters(n_zones=args.zones))
+    print(f"{'rows':>10} {'row-wise (s)':>14} {'vectorized (s)':>15} {'speed-up':>9}")
+
+    for n_rows in args.rows:
+        lat, lon = make_points(n_rows)
+        fast, fast_s = timed(assign_zones_vectorized, lat, lon, bbox_df)
+
+        if n_rows <= args.row_wise_limit:
+            slow, slow_s = timed(run_row_wise, lat, lon, bbox_df)
+            assert (slow == fast).all(), "vectorized result differs from assign_zone"
+            print(f"{n_rows:>10} {slow_s:>14.3f} {fast_s:>15.3f} {slow_s / fast_s:>8.0f}x")
+        else:
+            print(f"{n_rows:>10} {'-':>14} {fast_s:>15.3f} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# benchmarks/run_benchmarks.py
+#
+# Times and memory-profiles the analysis hot paths on synthetic data at
+# several scales and writes the results as JSON, so a regression shows up
+# as a diff against a committed results file. Run from the repository root:
+#     python -m benchmarks.run_benchmarks --rows 10000 100000 1000000
+#     python -m benchmarks.run_benchmarks --out benchmarks/results/mine.json \
+#         --baseline benchmarks/results/baseline.json
+#
+# results/baseline.json holds the code before the optimization work
+# (1,000,000 rows: one repeat, no memory run) and results/current.json the
+# code after it; both were taken on the same single-CPU Linux host, so the
+# parallel entries fall back to serial there.
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import scipy
+
+from benchmarks.synthetic_data import generate_dataset
+from modules.data_cleaner import assign_zones_to_df, generate_zone_bounding_boxes, generate_zone_summary
+from modules.processor import process_data
+from utils import zone_mapper
+from utils.anomaly_detector import detect_zscore_anomalies
+from utils.fake_news_utils import detect_fake_news
+from utils.zone_mapper import assign_zones_to_sensors_knn
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+# A median this much slower than the baseline is reported as a regression,
+# unless it moved by less than the noise floor (small inputs jitter a lot)
+REGRESSION_RATIO = 1.25
+NOISE_FLOOR_SECONDS = 0.01
+
+
+# === Benchmarks ===
+# Each entry builds the call's arguments from the dataset (untimed, fresh
+# copies every repeat since several functions add columns to their input)
+# and returns them with the function to time.
+def _assign_zones(data):
+    bbox_df = generate_zone_bounding_boxes(data["disaster_events"])
+    return assign_zones_to_df, (data["sensor_readings"], bbox_df)
+
+
+def _fake_news(data):
+    return detect_fake_news, (data["social_media_stream"].copy(), data["disaster_events"])
+
+
+def _process_data(data):
+    return process_data, (data["city_map"], data["energy_consumption"], data["disaster_events"])
+
+
+def _fake_news_parallel(data):
+    # workers=0: one process per core; compare against detect_fake_news.
+    # Single-core hosts (and inputs under PARALLEL_MIN_ROWS per worker) run
+    # serially, so scaling only shows in results with cpu_count > 1.
+    return (lambda social, events: detect_fake_news(social, events, workers=0),
+            (data["social_media_stream"].copy(), data["disaster_events"]))
+
+
+def _process_data_parallel(data):
+    return (lambda city_map, energy, events: process_data(city_map, energy, events, workers=0),
+            (data["city_map"], data["energy_consumption"], data["disaster_events"]))
+
+
+def _zscore(data):
+    return detect_zscore_anomalies, (data["sensor_readings"],)
+
+
+def _knn(data):
+    # Cold fit + predict: drop the in-memory index and skip the disk copy
+    zone_mapper._loaded_index = None
+    return (lambda sensors, events: assign_zones_to_sensors_knn(sensors, events, index_path=None),
+            (data["sensor_readings"].copy(), data["disaster_events"]))
+
+
+def _zone_summary(data):
+    bbox_df = generate_zone_bounding_boxes(data["disaster_events"])
+    sensors = data.setdefault("_zoned_sensors", assign_zones_to_df(data["sensor_readings"], bbox_df))
+    tweets = data.setdefault("_zoned_tweets", assign_zones_to_df(data["social_media_stream"], bbox_df))
+    return generate_zone_summary, (sensors, tweets, data["disaster_events"])
+
+
+BENCHMARKS = {
+    "assign_zones_to_df": _assign_zones,
+    "detect_fake_news": _fake_news,
+    "process_data": _process_data,
+    "detect_fake_news_parallel": _fake_news_parallel,
+    "process_data_parallel": _process_data_parallel,
+    "detect_zscore_anomalies": _zscore,
+    "assign_zones_to_sensors_knn": _knn,
+    "generate_zone_summary": _zone_summary,
+}
+
+
+# === Measurement ===
+def _rows_out(result):
+    if isinstance(result, tuple):
+        result = result[-1]
+    return len(result) if hasattr(result, "__len__") else None
+
+
+def measure(prepare, data, repeats=3, memory=True):
+    """Wall-clock seconds per repeat and, in one extra run, the traced peak allocation."""
+    seconds = []
+    rows_out = None
+    for _ in range(repeats):
+        func, args = prepare(data)
+        gc.collect()
+        start = time.perf_counter()
+        result = func(*args)
+        seconds.append(time.perf_counter() - start)
+        rows_out = _rows_out(result)
+        del result
+
+    peak_mb = None
+    if memory:
+        func, args = prepare(data)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_mb = round(peak / 2**20, 1)
+
+    return {
+        "repeats": repeats,
+        "seconds_min": round(min(seconds), 4),
+        "seconds_median": round(statistics.median(seconds), 4),
+        "peak_mb": peak_mb,
+        "rows_out": rows_out,
+    }
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scipy": scipy.__version__,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(rows_list, names, seed=0, repeats=3, memory=True):
+    results = []
+    for n_rows in rows_list:
+        data = generate_dataset(n_rows, seed)
+        for name in names:
+            entry = {"benchmark": name, "rows": n_rows, **measure(BENCHMARKS[name], data, repeats, memory)}
+            results.append(entry)
+            print(f"{name:>28} {n_rows:>10,} rows  median {entry['seconds_median']:8.3f}s  "
+                  f"min {entry['seconds_min']:8.3f}s  peak {entry['peak_mb'] or 0:8.1f} MB")
+    return results
+
+
+def compare(results, baseline_path, ratio=REGRESSION_RATIO, noise_floor=NOISE_FLOOR_SECONDS):
+    """Prints median-time ratios against a baseline file; returns the regressions."""
+    with open(baseline_path, "r") as f:
+        baseline = {(r["benchmark"], r["rows"]): r for r in json.load(f)["results"]}
+
+    regressions = []
+    print(f"\nAgainst {baseline_path} (regression above {ratio:.2f}x):")
+    for entry in results:
+        before = baseline.get((entry["benchmark"], entry["rows"]))
+        if before is None or not before["seconds_median"]:
+            continue
+        change = entry["seconds_median"] / before["seconds_median"]
+        slower = entry["seconds_median"] - before["seconds_median"]
+        flag = "REGRESSION" if change > ratio and slower > noise_floor else ""
+        if flag:
+            regressions.append(entry)
+        print(f"{entry['benchmark']:>28} {entry['rows']:>10,}  {before['seconds_median']:8.3f}s -> "
+              f"{entry['seconds_median']:8.3f}s  {change:5.2f}x {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis hot paths on synthetic data")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--out", default=os.path.join(RESULTS_DIR, "latest.json"))
+    parser.add_argument("--baseline", default=None, help="results file to compare against")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.only, args.seed, args.repeats, memory=not args.no_memory)
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump({"seed": args.seed, "environment": environment(), "results": results}, f, indent=2)
+        f.write("\n")
+    print(f"\nSaved {len(results)} results to {args.out}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline)
+        if regressions and args.fail_on_regression:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/stub_llm_server.py
+#
+# Local stand-in for the chat-completions endpoint, with injectable latency
+# and rate-limit errors, so the LLM batch paths can be measured offline:
+#     python -m benchmarks.stub_llm_server --port 8089 --latency 0.2
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubChatHandler(BaseHTTPRequestHandler):
+    latency = 0.2
+    error_rate = 0.0
+    answer = None  # callable(request) -> str, defaults to an echo
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        time.sleep(self.latency)
+
+        if random.random() < self.error_rate:
+            self._send(429, {"error": {"message": "rate limited", "type": "rate_limit_error"}})
+            return
+
+        prompt = request["messages"][-1]["content"]
+        content = self.answer(request) if self.answer else f"Stub summary of {len(prompt)} prompt chars."
+        self._send(200, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server(port=0, latency=0.2, error_rate=0.0, answer=None):
+    """
+    Starts the stub in a background thread and returns (server, base_url).
+    Call server.shutdown() when done.
+    """
+    handler = type("ConfiguredStubChatHandler", (StubChatHandler,), {
+        "latency": latency,
+        "error_rate": error_rate,
+        "answer": staticmethod(answer) if answer else None,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in chat-completions server")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 429 responses")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.port, args.latency, args.error_rate)
+    print(f"Serving stub chat completions at {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,165 @@
+# benchmarks/synthetic_data.py
+#
+# Deterministic synthetic datasets with the same columns and value ranges as
+# the bundled files, at any size. The same (rows, seed) always gives the
+# same frames. Run from the repository root to write a data folder that the
+# data_loader functions can read with data_dir=...:
+#     python -m benchmarks.synthetic_data --rows 1000000 --out data/synthetic_1m
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Extent, start time and label sets of the bundled datasets
+LAT_RANGE = (37.0, 38.0)
+LON_RANGE = (-122.6, -121.5)
+START = pd.Timestamp("2023-01-01")
+ZONES = [f"Zone {c}" for c in "ABCDE"]
+DISASTER_TYPES = ["earthquake", "fire", "flood", "hurricane", "industrial accident"]
+SENSOR_TYPES = ["temp", "humidity", "seismic", "flood"]
+SENSOR_STATUS = (["active", "inactive", "maintenance"], [0.85, 0.10, 0.05])
+BUILDING_TYPES = (["hospital", "shelter", "fire_station"], [0.35, 0.33, 0.32])
+TWEET_TEXTS = [
+    "flood near river", "emergency in Zone A", "fire in downtown", "earthquake felt", "evacuate Zone C",
+    "hurricane warning issued", "chemical smell near plant", "traffic is terrible", "nice weather today",
+]
+
+# Every table gets its own stream derived from the seed, so adding a
+# table never changes the others.
+_STREAMS = {"disasters": 0, "sensors": 1, "tweets": 2, "energy": 3, "city_map": 4}
+
+
+def _rng(seed, table):
+    return np.random.default_rng([seed, _STREAMS[table]])
+
+
+def _timestamps(rng, n_rows, minutes_per_row=1.0):
+    # One reading a minute on average, as in the bundled feeds, in time order
+    offsets = np.sort(rng.uniform(0, n_rows * minutes_per_row, n_rows))
+    return START + pd.to_timedelta(np.floor(offsets), unit="min")
+
+
+def make_disaster_events(n_rows, seed=0, span_minutes=None):
+    """disaster_events.csv: events clustered around one centre per zone."""
+    rng = _rng(seed, "disasters")
+    centre_lat = rng.uniform(*LAT_RANGE, len(ZONES))
+    centre_lon = rng.uniform(*LON_RANGE, len(ZONES))
+    zone = rng.integers(0, len(ZONES), n_rows)
+    span_minutes = span_minutes or max(n_rows, 50_000)
+    return pd.DataFrame({
+        "event_id": np.arange(1, n_rows + 1),
+        "date": START + pd.to_timedelta(np.sort(rng.integers(0, span_minutes, n_rows)), unit="min"),
+        "latitude": np.clip(centre_lat[zone] + rng.normal(0, 0.08, n_rows), *LAT_RANGE),
+        "longitude": np.clip(centre_lon[zone] + rng.normal(0, 0.08, n_rows), *LON_RANGE),
+        "disaster_type": rng.choice(DISASTER_TYPES, n_rows),
+        "location": np.array(ZONES)[zone],
+        "severity": rng.integers(1, 10, n_rows),
+        "casualties": rng.poisson(3, n_rows),
+        "economic_loss_million_usd": np.round(rng.gamma(2.0, 5.0, n_rows), 2),
+        "duration_hours": rng.integers(1, 72, n_rows),
+    })
+
+
+def make_sensor_readings(n_rows, seed=0, n_sensors=1000):
+    """sensor_readings.csv: fixed sensor sites reporting once a minute on average."""
+    rng = _rng(seed, "sensors")
+    site_lat = rng.uniform(*LAT_RANGE, n_sensors)
+    site_lon = rng.uniform(*LON_RANGE, n_sensors)
+    site_type = rng.choice(SENSOR_TYPES, n_sensors)
+    sensor = rng.integers(0, n_sensors, n_rows)
+    return pd.DataFrame({
+        "sensor_id": sensor + 1000,
+        "timestamp": _timestamps(rng, n_rows),
+        "latitude": site_lat[sensor],
+        "longitude": site_lon[sensor],
+        "sensor_type": site_type[sensor],
+        "reading_value": rng.uniform(0, 100, n_rows),
+        "status": rng.choice(SENSOR_STATUS[0], n_rows, p=SENSOR_STATUS[1]),
+    })
+
+
+def make_social_media(n_rows, seed=0):
+    """social_media_stream.csv: short posts from a small vocabulary."""
+    rng = _rng(seed, "tweets")
+    return pd.DataFrame({
+        "user_id": rng.integers(100_000, 200_000, n_rows),
+        "text": rng.choice(TWEET_TEXTS, n_rows),
+        "timestamp": _timestamps(rng, n_rows),
+        "latitude": rng.uniform(*LAT_RANGE, n_rows),
+        "longitude": rng.uniform(*LON_RANGE, n_rows),
+    })
+
+
+def make_energy_consumption(n_rows, seed=0, n_buildings=1000):
+    """energy_consumption.csv: readings for buildings 0..n_buildings-1."""
+    rng = _rng(seed, "energy")
+    return pd.DataFrame({
+        "building_id": rng.integers(0, n_buildings, n_rows),
+        "timestamp": _timestamps(rng, n_rows),
+        "energy_kwh": rng.uniform(0, 500, n_rows),
+    })
+
+
+def make_city_map(n_buildings=1000, seed=0):
+    """city_map.geojson: one Point feature per building, named "Location <id>"."""
+    rng = _rng(seed, "city_map")
+    lat = rng.uniform(*LAT_RANGE, n_buildings)
+    lon = rng.uniform(*LON_RANGE, n_buildings)
+    kinds = rng.choice(BUILDING_TYPES[0], n_buildings, p=BUILDING_TYPES[1])
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [float(x), float(y)]},
+                "properties": {"name": f"Location {i}", "type": str(kind)},
+            }
+            for i, (x, y, kind) in enumerate(zip(lon, lat, kinds))
+        ],
+    }
+
+
+def event_count(n_rows):
+    # The bundled data has far fewer events than readings
+    return max(n_rows // 20, 500)
+
+
+def generate_dataset(n_rows, seed=0, n_buildings=1000):
+    """All tables for one scale; feeds have n_rows rows, events n_rows // 20."""
+    return {
+        "disaster_events": make_disaster_events(event_count(n_rows), seed, span_minutes=n_rows),
+        "sensor_readings": make_sensor_readings(n_rows, seed),
+        "social_media_stream": make_social_media(n_rows, seed),
+        "energy_consumption": make_energy_consumption(n_rows, seed, n_buildings),
+        "city_map": make_city_map(n_buildings, seed),
+    }
+
+
+def write_dataset(out_dir, n_rows, seed=0, n_buildings=1000):
+    """Writes the tables under the file names data_loader expects."""
+    os.makedirs(out_dir, exist_ok=True)
+    for name, table in generate_dataset(n_rows, seed, n_buildings).items():
+        if name == "city_map":
+            with open(os.path.join(out_dir, "city_map.geojson"), "w") as f:
+                json.dump(table, f)
+        else:
+            table.to_csv(os.path.join(out_dir, f"{name}.csv"), index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic CrisisVerse data folder")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--buildings", type=int, default=1000)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    write_dataset(args.out, args.rows, args.seed, args.buildings)
+    print(f"Wrote {args.rows:,}-row synthetic dataset to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
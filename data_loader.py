@@ -3,36 +3,305 @@
 import pandas as pd
 import json
 import os
+import io
+import time
+import hashlib
+from itertools import islice
+
+from utils.profiling import profiled, stage
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:  # fall back to plain CSV parsing
+    PARQUET_AVAILABLE = False
 
 DATA_DIR = "data"
 
-def load_disaster_events():
-    return pd.read_csv(os.path.join(DATA_DIR, "disaster_events.csv"))
+# === Columnar Cache Settings ===
+# Each CSV gets a Parquet copy in a ".cache" folder next to it. The copy is
+# stamped with the source fingerprint and reused until the CSV changes.
+CACHE_DIR_NAME = ".cache"
+CACHE_VERSION = 2
+CACHE_ENABLED = os.environ.get("CRISISVERSE_CSV_CACHE", "1") != "0"
+# mtime/size catch normal edits; also hashing the file content catches
+# tools that rewrite a CSV without changing either (slower on big feeds).
+CACHE_VERIFY_HASH = os.environ.get("CRISISVERSE_CACHE_HASH", "0") == "1"
+
+_METADATA_KEY = b"crisisverse_fingerprint"
+_load_stats = {}
+
+
+def source_fingerprint(path, verify_hash=None):
+    """
+    Returns a dict identifying the current version of a source file
+    (size, mtime and optionally a SHA-1 of its content).
+    """
+    if verify_hash is None:
+        verify_hash = CACHE_VERIFY_HASH
+    stat = os.stat(path)
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if verify_hash:
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        fingerprint["sha1"] = digest.hexdigest()
+    return fingerprint
+
+
+def _cache_path(path):
+    folder, name = os.path.split(path)
+    return os.path.join(folder, CACHE_DIR_NAME, os.path.splitext(name)[0] + ".parquet")
+
+
+@profiled("data_loader.read_parquet")
+def _read_cache(cache_path, expected, columns=None):
+    """Returns the cached frame if its stamp matches `expected`, else None."""
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        metadata = pq.read_schema(cache_path).metadata or {}
+        stamp = json.loads(metadata.get(_METADATA_KEY, b"{}"))
+        if stamp != expected:
+            return None
+        return pq.read_table(cache_path, columns=columns).to_pandas()
+    except (OSError, ValueError, pa.ArrowException):
+        return None
+
+
+@profiled("data_loader.write_parquet")
+def _write_cache(cache_path, df, stamp):
+    """Writes the frame atomically so concurrent readers never see half a file."""
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[_METADATA_KEY] = json.dumps(stamp).encode()
+        table = table.replace_schema_metadata(metadata)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, cache_path)
+    except (OSError, ValueError, pa.ArrowException):
+        # The cache is an optimisation only; a read-only data folder is fine.
+        pass
+
+
+def _record(path, hit, seconds, rows):
+    stats = _load_stats.setdefault(path, {
+        "hits": 0, "misses": 0, "last_source": None,
+        "last_seconds": 0.0, "total_seconds": 0.0, "rows": 0
+    })
+    stats["hits" if hit else "misses"] += 1
+    stats["last_source"] = "parquet" if hit else "csv"
+    stats["last_seconds"] = seconds
+    stats["total_seconds"] += seconds
+    stats["rows"] = rows
+
+
+def read_csv_cached(path, columns=None, **read_csv_kwargs):
+    """
+    Reads a CSV through the columnar cache. On a miss the CSV is parsed once
+    and written to Parquet; later calls read the Parquet copy until the CSV's
+    fingerprint changes. `columns` limits the returned (and read) columns.
+    """
+    start = time.perf_counter()
+    if not (CACHE_ENABLED and PARQUET_AVAILABLE):
+        if columns is not None:
+            read_csv_kwargs = _project_read_kwargs(read_csv_kwargs, columns)
+        with stage("data_loader.parse_csv") as s:
+            df = pd.read_csv(path, **read_csv_kwargs)
+            s.rows = len(df)
+        if columns is not None:
+            df = df[list(columns)]
+        _record(path, False, time.perf_counter() - start, len(df))
+        return df
+
+    stamp = {
+        "version": CACHE_VERSION,
+        "source": source_fingerprint(path),
+        "read_kwargs": repr(sorted(read_csv_kwargs.items())),
+    }
+    cache_path = _cache_path(path)
+    df = _read_cache(cache_path, stamp, columns)
+    hit = df is not None
+    if not hit:
+        # Always cache the full typed frame so any later projection can hit it.
+        with stage("data_loader.parse_csv") as s:
+            df = pd.read_csv(path, **read_csv_kwargs)
+            s.rows = len(df)
+        _write_cache(cache_path, df, stamp)
+        if columns is not None:
+            df = df[list(columns)]
+
+    _record(path, hit, time.perf_counter() - start, len(df))
+    return df
+
+
+def _project_read_kwargs(read_csv_kwargs, columns):
+    """Narrows usecols/parse_dates to the requested columns."""
+    read_csv_kwargs = dict(read_csv_kwargs, usecols=list(columns))
+    if "parse_dates" in read_csv_kwargs:
+        read_csv_kwargs["parse_dates"] = [c for c in read_csv_kwargs["parse_dates"] if c in columns]
+    return read_csv_kwargs
+
+
+def data_version(data_dir=DATA_DIR):
+    """
+    Cheap stamp of the data files in `data_dir` (name, size, mtime), for
+    keying in-memory caches on the current version of the data.
+    """
+    version = []
+    for entry in os.scandir(data_dir):
+        if entry.is_file() and entry.name.endswith((".csv", ".geojson")):
+            stat = entry.stat()
+            version.append((entry.name, stat.st_size, stat.st_mtime_ns))
+    return sorted(version)
+
+
+def get_load_stats():
+    """Returns per-file hit/miss counts and load timings as a DataFrame."""
+    stats = pd.DataFrame.from_dict(_load_stats, orient="index")
+    stats.index.name = "path"
+    return stats
+
+
+def reset_load_stats():
+    _load_stats.clear()
+
+
+def clear_cache(data_dir=DATA_DIR):
+    """Deletes every cached Parquet file under `data_dir`."""
+    for root, _, files in os.walk(data_dir):
+        if os.path.basename(root) != CACHE_DIR_NAME:
+            continue
+        for name in files:
+            if name.endswith(".parquet"):
+                os.remove(os.path.join(root, name))
+
+
+# === Incremental CSV Reading ===
+def read_csv_header(path):
+    """Returns the column names and the byte length of the header line."""
+    with open(path, "rb") as f:
+        header_line = f.readline()
+    names = pd.read_csv(io.BytesIO(header_line), nrows=0).columns.tolist()
+    return names, len(header_line)
+
+
+def iter_csv_tail(path, offset=0, chunksize=100_000, **read_csv_kwargs):
+    """
+    Yields (chunk_df, end_offset) for the rows of `path` that start at byte
+    `offset` (0 means "right after the header"). Only newline-terminated
+    lines are consumed, so a row still being appended is left for the next
+    call; resume by passing the last end_offset back in. Assumes one record
+    per line, which holds for the sensor and social-media feeds.
+    """
+    names, header_size = read_csv_header(path)
+    offset = max(offset, header_size)
+
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            lines = list(islice(f, chunksize))
+            complete = bool(lines) and lines[-1].endswith(b"\n")
+            if lines and not complete:
+                lines.pop()
+            if not lines:
+                break
+            data = b"".join(lines)
+            offset += len(data)
+            chunk = pd.read_csv(io.BytesIO(data), names=names, header=None, **read_csv_kwargs)
+            yield chunk, offset
+            if not complete:
+                break
+
+
+# === Dataset Schemas ===
+# Low-cardinality labels become categories, coordinates float32, and date
+# columns are parsed while reading so callers get ready-to-use frames.
+COORDS = {"latitude": "float32", "longitude": "float32"}
+
+SCHEMAS = {
+    "disaster_events.csv": {
+        "dtype": {**COORDS, "disaster_type": "category", "location": "category"},
+        "parse_dates": ["date"],
+    },
+    "sensor_readings.csv": {
+        "dtype": {**COORDS, "sensor_type": "category", "status": "category"},
+        "parse_dates": ["timestamp"],
+    },
+    "social_media_stream.csv": {
+        "dtype": COORDS,
+        "parse_dates": ["timestamp"],
+    },
+    "energy_consumption.csv": {
+        "parse_dates": ["timestamp"],
+    },
+    "transportation.csv": {
+        "dtype": {"status": "category"},
+        "parse_dates": ["departure_time", "arrival_time"],
+    },
+    "events_calendar.csv": {
+        "dtype": {"location": "category", "type": "category"},
+        "parse_dates": ["date"],
+    },
+    "economic_activity.csv": {
+        "parse_dates": ["date"],
+    },
+    "local_business_reviews.csv": {
+        "dtype": {"business_name": "category"},
+    },
+}
+
+
+@profiled()
+def load_csv(filename, columns=None, data_dir=DATA_DIR):
+    """
+    Loads `filename` from `data_dir` with its schema from SCHEMAS applied.
+    Pass `columns` to read only the columns a view needs.
+    """
+    path = os.path.join(data_dir, filename)
+    schema = SCHEMAS.get(filename, {})
+    read_csv_kwargs = {}
+    if "dtype" in schema:
+        read_csv_kwargs["dtype"] = schema["dtype"]
+    if "parse_dates" in schema:
+        header = pd.read_csv(path, nrows=0).columns
+        parse_dates = [c for c in schema["parse_dates"] if c in header]
+        if parse_dates:
+            read_csv_kwargs["parse_dates"] = parse_dates
+    return read_csv_cached(path, columns=columns, **read_csv_kwargs)
+
+
+def load_disaster_events(columns=None, data_dir=DATA_DIR):
+    return load_csv("disaster_events.csv", columns, data_dir)
 
-def load_sensor_readings():
-    return pd.read_csv(os.path.join(DATA_DIR, "sensor_readings.csv"))
+def load_sensor_readings(columns=None, data_dir=DATA_DIR):
+    return load_csv("sensor_readings.csv", columns, data_dir)
 
-def load_social_media():
-    return pd.read_csv(os.path.join(DATA_DIR, "social_media_stream.csv"))
+def load_social_media(columns=None, data_dir=DATA_DIR):
+    return load_csv("social_media_stream.csv", columns, data_dir)
 
-def load_weather_data():
-    return pd.read_csv(os.path.join(DATA_DIR, "weather_historical.csv"))
+def load_weather_data(columns=None, data_dir=DATA_DIR):
+    return load_csv("weather_historical.csv", columns, data_dir)
 
-def load_city_map():
-    with open(os.path.join(DATA_DIR, "city_map.geojson"), "r") as f:
+def load_city_map(data_dir=DATA_DIR):
+    with open(os.path.join(data_dir, "city_map.geojson"), "r") as f:
         return json.load(f)
 
-def load_energy_data():
-    return pd.read_csv(os.path.join(DATA_DIR, "energy_consumption.csv"))
+def load_energy_data(columns=None, data_dir=DATA_DIR):
+    return load_csv("energy_consumption.csv", columns, data_dir)
 
-def load_transportation_data():
-    return pd.read_csv(os.path.join(DATA_DIR, "transportation.csv"))
+def load_transportation_data(columns=None, data_dir=DATA_DIR):
+    return load_csv("transportation.csv", columns, data_dir)
 
-def load_events_calendar():
-    return pd.read_csv(os.path.join(DATA_DIR, "events_calendar.csv"))
+def load_events_calendar(columns=None, data_dir=DATA_DIR):
+    return load_csv("events_calendar.csv", columns, data_dir)
 
-def load_economic_activity():
-    return pd.read_csv(os.path.join(DATA_DIR, "economic_activity.csv"))
+def load_economic_activity(columns=None, data_dir=DATA_DIR):
+    return load_csv("economic_activity.csv", columns, data_dir)
 
-def load_business_reviews():
-    return pd.read_csv(os.path.join(DATA_DIR, "local_business_reviews.csv"))
+def load_business_reviews(columns=None, data_dir=DATA_DIR):
+    return load_csv("local_business_reviews.csv", columns, data_dir)
@@ -1,6 +1,10 @@
 import pandas as pd
-import geopandas as gpd
-from shapely.geometry import Point
+import numpy as np
+
+from utils.quantile_sketch import KLLSketch
+from utils.zone_polygons import assign_zones
+from utils.zone_store import ZoneAggregateStore
+from utils.profiling import profiled
 
 # Step 1: Generate zone bounding boxes from disaster dataset
 def generate_zone_bounding_boxes(disaster_df):
@@ -15,6 +19,18 @@ def generate_zone_bounding_boxes(disaster_df):
     return bbox_df
 
 
+# Step 1b: Merge boxes computed on separate chunks of the disaster data
+def combine_zone_bounding_boxes(*bbox_dfs):
+    """Combines partial bounding boxes into the boxes of the whole dataset."""
+    bbox_df = pd.concat(bbox_dfs, ignore_index=True)
+    return bbox_df.groupby("Zone").agg({
+        "Lat_Min": "min",
+        "Lat_Max": "max",
+        "Lon_Min": "min",
+        "Lon_Max": "max"
+    }).reset_index()
+
+
 # Step 2: Assign zone from bounding box
 def assign_zone(lat, lon, bbox_df):
     for _, row in bbox_df.iterrows():
@@ -23,91 +39,179 @@ def assign_zone(lat, lon, bbox_df):
     return "Unknown"
 
 
+# Step 2b: Vectorized version of assign_zone for whole columns
+@profiled()
+def assign_zones_vectorized(lat, lon, bbox_df, chunk_size=250_000):
+    """
+    Assigns a zone to every (lat, lon) pair with broadcast box comparisons.
+    Same semantics as assign_zone: the first box in bbox_df order that
+    contains the point wins, and points outside every box get "Unknown".
+    Points are processed in chunks so memory stays at chunk_size x zones.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+
+    zones = np.append(bbox_df["Zone"].to_numpy(dtype=object), "Unknown")
+    lat_min = bbox_df["Lat_Min"].to_numpy(dtype=np.float64)
+    lat_max = bbox_df["Lat_Max"].to_numpy(dtype=np.float64)
+    lon_min = bbox_df["Lon_Min"].to_numpy(dtype=np.float64)
+    lon_max = bbox_df["Lon_Max"].to_numpy(dtype=np.float64)
+    unknown = len(zones) - 1
+
+    codes = np.full(len(lat), unknown, dtype=np.intp)
+    if unknown == 0:
+        return zones[codes]
+
+    for start in range(0, len(lat), chunk_size):
+        la = lat[start:start + chunk_size, None]
+        lo = lon[start:start + chunk_size, None]
+        inside = (la >= lat_min) & (la <= lat_max) & (lo >= lon_min) & (lo <= lon_max)
+        # argmax returns the first True column, i.e. the first matching box
+        first = inside.argmax(axis=1)
+        first[~inside.any(axis=1)] = unknown
+        codes[start:start + chunk_size] = first
+
+    return zones[codes]
+
+
 # Step 3: Apply to a dataframe (e.g. sensor or tweet)
+@profiled()
 def assign_zones_to_df(df, bbox_df):
-    df = df.dropna(subset=["latitude", "longitude"])
-    df["zone"] = df.apply(lambda row: assign_zone(row["latitude"], row["longitude"], bbox_df), axis=1)
+    df = df.dropna(subset=["latitude", "longitude"]).copy()
+    df["zone"] = assign_zones_vectorized(df["latitude"].to_numpy(), df["longitude"].to_numpy(), bbox_df)
     return df
-import geopandas as gpd
-import pandas as pd
 
-# === Assign Zones Based on City Map (GeoSpatial Join) ===
-def assign_zones_geospatial(df, zones_gdf):
+
+# === Geospatial Zone Assignment ===
+def assign_zones_geospatial(df, zones_gdf, label_column=None):
     """
-    Assigns each row (with lat/lon) to a zone from the GeoJSON map using spatial join.
+    Assigns city zones to each lat/lon point from zone polygons: a
+    GeoDataFrame, labelled by label_column or its name/Zone/id column, or
+    a prepared ZonePolygonIndex. The prepared polygons are cached per
+    version of the map (see utils.zone_polygons).
     """
-    gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df.longitude, df.latitude), crs=zones_gdf.crs)
-    joined = gpd.sjoin(gdf, zones_gdf, how="left", predicate="within")
-    
-    if 'Zone' in joined.columns:
-        df["zone"] = joined["Zone"]
-    elif 'name' in joined.columns:
-        df["zone"] = joined["name"]
-    elif 'id' in joined.columns:
-        df["zone"] = joined["id"]
-    else:
-        df["zone"] = "Unknown"
+    return assign_zones(df, zones_gdf, label_column)
 
-    return df
-import pandas as pd
+# === Sensor Data Cleaning ===
+# Outliers are judged against the spread of the same kind of sensor (and
+# optionally the same zone): one IQR over temperature, humidity, seismic
+# and flood readings together fits none of them.
+SENSOR_IQR_GROUPS = ("sensor_type",)
+IQR_WHISKER = 1.5
 
-# === Clean Sensor Data ===
-def clean_sensor_data_inclusive(df):
-    """
-    Cleans sensor data by removing invalid timestamps, filtering by active status,
-    and removing extreme outliers based on IQR method.
-    """
+
+def _active_readings(df):
     df = df.copy()
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
     df = df[df["status"] == "active"]
+    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    return df.dropna(subset=["reading_value", "latitude", "longitude"])
 
-    Q1 = df["reading_value"].quantile(0.25)
-    Q3 = df["reading_value"].quantile(0.75)
-    IQR = Q3 - Q1
-    lower, upper = Q1 - 1.5 * IQR, Q3 + 1.5 * IQR
 
-    df = df[(df["reading_value"] >= lower) & (df["reading_value"] <= upper)]
-    return df
-# === Clean Social Media Data ===
-def clean_social_media_data(df):
+def _group_keys(df, group_by):
+    # No grouping is one group over every reading
+    if group_by:
+        return df, list(group_by)
+    return df.assign(_all=0), ["_all"]
+
+
+def _bounds_frame(index, q1, q3, whisker):
+    iqr = q3 - q1
+    return pd.DataFrame({"Q1": q1, "Q3": q3, "lower": q1 - whisker * iqr, "upper": q3 + whisker * iqr}, index=index)
+
+
+def sensor_iqr_bounds(df, group_by=SENSOR_IQR_GROUPS, whisker=IQR_WHISKER):
+    """Exact Q1/Q3 and outlier bounds of reading_value per group, in one grouped pass."""
+    df, keys = _group_keys(df, group_by)
+    quartiles = df.groupby(keys, dropna=False, observed=True)["reading_value"].quantile([0.25, 0.75])
+    quartiles = quartiles.unstack().reindex(columns=[0.25, 0.75])
+    index = quartiles.index
+    if not isinstance(index, pd.MultiIndex):
+        index = pd.MultiIndex.from_arrays([index], names=keys)
+    return _bounds_frame(index, quartiles[0.25].to_numpy(), quartiles[0.75].to_numpy(), whisker)
+
+
+def apply_iqr_bounds(df, bounds, group_by=SENSOR_IQR_GROUPS):
+    """Keeps the rows whose reading lies within their group's [lower, upper] (rows of unknown groups are dropped)."""
+    grouped, keys = _group_keys(df, group_by)
+    # Number the bounds' groups and the rows' groups together (dropna=False
+    # so a missing type or zone is a group of its own), then map row groups
+    # to bounds rows
+    stacked = pd.concat([bounds.index.to_frame(index=False), grouped[keys]], ignore_index=True)
+    codes = stacked.groupby(keys, dropna=False, observed=True, sort=False).ngroup().to_numpy()
+    bounds_row = np.full(codes.max(initial=-1) + 1, -1)
+    bounds_row[codes[:len(bounds)]] = np.arange(len(bounds))
+    position = bounds_row[codes[len(bounds):]]
+    lower = np.append(bounds["lower"].to_numpy(dtype=np.float64), np.nan)[position]
+    upper = np.append(bounds["upper"].to_numpy(dtype=np.float64), np.nan)[position]
+    values = df["reading_value"].to_numpy(dtype=np.float64)
+    return df[(values >= lower) & (values <= upper)]
+
+
+@profiled()
+def clean_sensor_data_inclusive(df, group_by=SENSOR_IQR_GROUPS, bounds=None, whisker=IQR_WHISKER):
     """
-    Cleans social media tweets by parsing timestamps and removing duplicate texts.
+    Keeps active readings with a timestamp, value and location, minus IQR
+    outliers of their group: per sensor_type by default, per
+    ("sensor_type", "zone") for zone-aware cleaning, or over all readings
+    with group_by=None. Pass `bounds` (e.g. from sketch_iqr_bounds) to
+    clean against bounds computed elsewhere.
     """
-    df = df.copy()
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-    df = df.drop_duplicates(subset="text")
-    df = df.dropna(subset=["latitude", "longitude"])
-    return df
+    df = _active_readings(df)
+    if bounds is None:
+        bounds = sensor_iqr_bounds(df, group_by, whisker)
+    return apply_iqr_bounds(df, bounds, group_by)
 
 
-# === Geospatial Zone Assignment ===
-def assign_zones_geospatial(df, zones_gdf):
-    """Assigns city zones to each lat/lon point using a GeoDataFrame"""
-    df = df.copy()
-    df = df.dropna(subset=["latitude", "longitude"])
+# === Out-of-core Sensor Cleaning ===
+def sketch_sensor_readings(df, group_by=SENSOR_IQR_GROUPS, sketches=None, k=200):
+    """
+    Folds a chunk's active readings into one KLLSketch per group (a dict
+    keyed by group tuple). Sketches of separate chunks or files can be
+    merged, and memory stays O(k) per group whatever the data size.
+    """
+    sketches = {} if sketches is None else sketches
+    df, keys = _group_keys(_active_readings(df), group_by)
+    for key, values in df.groupby(keys, dropna=False, observed=True, sort=False)["reading_value"]:
+        key = tuple(None if pd.isna(value) else value for value in key)
+        sketches.setdefault(key, KLLSketch(k)).update(values.to_numpy())
+    return sketches
 
-    gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df["longitude"], df["latitude"]), crs="EPSG:4326")
-    joined = gpd.sjoin(gdf, zones_gdf, how="left", predicate="within")
-    df["zone"] = joined["name"]  # assumes 'name' column in geojson defines zone name like A/B/C/D
-    return df
 
-# === Sensor Data Cleaning ===
-def clean_sensor_data_inclusive(df):
-    df = df.copy()
-    df = df[df["status"] == "active"]
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-    df = df.dropna(subset=["reading_value", "latitude", "longitude"])
-    
-    Q1 = df["reading_value"].quantile(0.25)
-    Q3 = df["reading_value"].quantile(0.75)
-    IQR = Q3 - Q1
-    lower = Q1 - 1.5 * IQR
-    upper = Q3 + 1.5 * IQR
-    df = df[(df["reading_value"] >= lower) & (df["reading_value"] <= upper)]
+def sketch_iqr_bounds(sketches, group_by=SENSOR_IQR_GROUPS, whisker=IQR_WHISKER):
+    """Approximate per-group bounds, in the sensor_iqr_bounds format, from sketch_sensor_readings sketches."""
+    names = list(group_by) if group_by else ["_all"]
+    keys = list(sketches)
+    quartiles = np.array([sketches[key].quantile([0.25, 0.75]) for key in keys]).reshape(-1, 2)
+    if keys:
+        index = pd.MultiIndex.from_tuples(keys, names=names)
+    else:
+        index = pd.MultiIndex.from_arrays([[] for _ in names], names=names)
+    return _bounds_frame(index, quartiles[:, 0], quartiles[:, 1], whisker)
 
-    return df
+
+def clean_sensor_chunks(chunks, group_by=SENSOR_IQR_GROUPS, whisker=IQR_WHISKER, k=200):
+    """
+    Cleans readings too large for memory. `chunks` is a callable returning
+    a fresh iterable of frames (e.g. a chunked read_csv); the first pass
+    sketches each group's quartiles, the second yields every chunk cleaned
+    against the resulting bounds.
+    """
+    sketches = {}
+    for chunk in chunks():
+        sketch_sensor_readings(chunk, group_by, sketches, k)
+    bounds = sketch_iqr_bounds(sketches, group_by, whisker)
+    for chunk in chunks():
+        yield apply_iqr_bounds(_active_readings(chunk), bounds, group_by)
+
+
+def clean_sensor_file(path, group_by=SENSOR_IQR_GROUPS, chunksize=500_000, whisker=IQR_WHISKER, k=200,
+                      **read_csv_kwargs):
+    """clean_sensor_chunks over a CSV read chunksize rows at a time."""
+    return clean_sensor_chunks(lambda: pd.read_csv(path, chunksize=chunksize, **read_csv_kwargs),
+                               group_by, whisker, k)
 
 # === Tweet Data Cleaning ===
+@profiled()
 def clean_social_media_data(df):
     df = df.copy()
     df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
@@ -116,21 +220,33 @@ def clean_social_media_data(df):
     return df
 
 # === Zone Summary ===
-def generate_zone_summary(sensor_df, tweets_df, disaster_df=None):
-    # Clean the inputs
-    sensor_df = clean_sensor_data_inclusive(sensor_df)
-    tweets_df = clean_social_media_data(tweets_df)
+@profiled()
+def generate_zone_summary(sensor_df=None, tweets_df=None, disaster_df=None, store=None):
+    """
+    Per-zone sensor, tweet and disaster counts, answered from a
+    ZoneAggregateStore. Given frames are cleaned and appended to `store`
+    first; pass a long-lived store with only the new rows to keep the
+    summary incremental.
+    """
+    if store is None:
+        store = ZoneAggregateStore()
+    if sensor_df is not None:
+        store.append_sensors(clean_sensor_data_inclusive(sensor_df))
+    if tweets_df is not None:
+        store.append_tweets(clean_social_media_data(tweets_df))
 
     # Sensor Summary
-    sensor_summary = sensor_df.groupby("zone").agg({
-        "reading_value": ["mean", "max", "count"],
-        "sensor_type": lambda x: x.value_counts().index[0]
-    }).reset_index()
-    sensor_summary.columns = ["Zone", "Avg Reading", "Max Reading", "Sensor Count", "Top Sensor Type"]
+    zones = store.zone_stats()
+    sensor_summary = pd.DataFrame({
+        "Zone": zones.index,
+        "Avg Reading": zones["mean"].to_numpy(),
+        "Max Reading": zones["max"].to_numpy(),
+        "Sensor Count": zones["count"].to_numpy(),
+        "Top Sensor Type": zones["top_sensor_type"].to_numpy(),
+    })
 
     # Tweet Summary
-    tweet_summary = tweets_df.groupby("zone").size().reset_index(name="Tweet Count")
-    tweet_summary.rename(columns={"zone": "Zone"}, inplace=True)
+    tweet_summary = store.tweet_counts().rename("Tweet Count").rename_axis("Zone").reset_index()
 
     # Merge sensor + tweet summaries
     zone_data = pd.merge(sensor_summary, tweet_summary, on="Zone", how="outer")
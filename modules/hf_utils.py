@@ -1,9 +1,73 @@
-from transformers import pipeline
+import hashlib
+import threading
+from collections import OrderedDict
+
+from utils.profiling import profiled
 
 # ⚠️ Generic sentiment model used to simulate fake/real
-classifier = pipeline("sentiment-analysis")
+MODEL_TASK = "sentiment-analysis"
+CACHE_MAX_ENTRIES = 100_000
 
-def hf_classify(tweet):
-    result = classifier(tweet)[0]
+_classifier = None
+_classifier_lock = threading.Lock()
+_results = OrderedDict()  # text hash -> (label, score), least recently used first
+_results_lock = threading.Lock()
+
+
+@profiled()
+def get_classifier():
+    """Loads the transformers pipeline on first use and shares it afterwards."""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                from transformers import pipeline
+                _classifier = pipeline(MODEL_TASK)
+    return _classifier
+
+
+def _to_label(result):
     label = "FAKE" if result["label"] == "NEGATIVE" else "REAL"
     return label, round(result["score"] * 100, 1)
+
+
+def _text_key(text):
+    return hashlib.sha1(str(text).encode("utf-8")).hexdigest()
+
+
+def hf_classify(tweet):
+    return hf_classify_batch([tweet])[0]
+
+
+@profiled()
+def hf_classify_batch(tweets, batch_size=64):
+    """
+    Classifies many tweets at once. Identical texts are scored once, unseen
+    texts go through the pipeline in batches of `batch_size`, and results
+    are kept in a bounded LRU cache keyed by a hash of the text.
+    Returns a list of (label, score) in input order.
+    """
+    keys = [_text_key(tweet) for tweet in tweets]
+    results = {}
+    with _results_lock:
+        for key in set(keys):
+            if key in _results:
+                _results.move_to_end(key)
+                results[key] = _results[key]
+
+    pending = {key: str(tweet) for key, tweet in zip(keys, tweets) if key not in results}
+    if pending:
+        outputs = get_classifier()(list(pending.values()), batch_size=batch_size, truncation=True)
+        fresh = {key: _to_label(output) for key, output in zip(pending, outputs)}
+        results.update(fresh)
+        with _results_lock:
+            _results.update(fresh)
+            while len(_results) > CACHE_MAX_ENTRIES:
+                _results.popitem(last=False)
+
+    return [results[key] for key in keys]
+
+
+def clear_cache():
+    with _results_lock:
+        _results.clear()
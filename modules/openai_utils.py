@@ -1,12 +1,47 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+
 import openai
 import streamlit as st  # <-- to access secrets
 
-client = openai.OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+from utils.profiling import profiled
+
+LLM_CACHE_DIR = os.path.join("data", ".cache", "llm")
+VERDICT_CACHE_DIR = os.path.join("data", ".cache", "tweet_verdicts")
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+_client = None
+
+
+# === Clients (created on first use, not at import) ===
+def _api_key():
+    key = os.environ.get("OPENAI_API_KEY")
+    if key:
+        return key
+    return st.secrets["OPENAI_API_KEY"]
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = openai.OpenAI(api_key=_api_key())
+    return _client
+
 
 def classify_tweet(tweet):
     prompt = f"Classify the following tweet as 'Real' or 'Fake' and explain in 1 line:\n\nTweet: {tweet}"
-    
-    response = client.chat.completions.create(
+
+    response = get_client().chat.completions.create(
         model="gpt-3.5-turbo",
         messages=[
             {"role": "system", "content": "You are a misinformation expert for city emergencies."},
@@ -16,15 +51,11 @@ def classify_tweet(tweet):
         temperature=0.3
     )
     return response.choices[0].message.content
-from openai import OpenAI
-import streamlit as st
-import os
 
-# Initialize OpenAI client
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
 
-def summarize_zone_stats(zone, hour, avg, max_val, count, sensor_type):
-    prompt = f"""
+# === Zone Summaries ===
+def build_zone_prompt(zone, hour, avg, max_val, count, sensor_type):
+    return f"""
     You are an AI risk analyst summarizing crisis activity in a smart city zone.
 
     Zone: {zone}
@@ -37,14 +68,286 @@ def summarize_zone_stats(zone, hour, avg, max_val, count, sensor_type):
     Generate a brief, clear summary (2-3 lines) explaining the situation and potential risks in plain English.
     """
 
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
+
+def zone_summary_request(zone, hour, avg, max_val, count, sensor_type):
+    return {
+        "model": "gpt-3.5-turbo",
+        "messages": [
             {"role": "system", "content": "You are an emergency response analyst."},
-            {"role": "user", "content": prompt}
+            {"role": "user", "content": build_zone_prompt(zone, hour, avg, max_val, count, sensor_type)}
         ],
-        temperature=0.5,
-        max_tokens=120
-    )
+        "temperature": 0.5,
+        "max_tokens": 120,
+    }
+
 
+def summarize_zone_stats(zone, hour, avg, max_val, count, sensor_type):
+    request = zone_summary_request(zone, hour, avg, max_val, count, sensor_type)
+    response = get_client().chat.completions.create(**request)
     return response.choices[0].message.content.strip()
+
+
+# === Batch Infrastructure ===
+class ResponseCache:
+    """
+    On-disk memo of chat completions, one JSON file per request, keyed by a
+    SHA-256 of the model, messages and sampling parameters.
+    """
+
+    def __init__(self, cache_dir=LLM_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def key(request):
+        return hashlib.sha256(json.dumps(request, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "r") as f:
+                return json.load(f)["answer"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key, answer):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"answer": answer}, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # caching is best-effort
+
+
+class RateLimiter:
+    """Spaces request starts so at most `rate` begin per second."""
+
+    def __init__(self, rate=None):
+        self.rate = rate
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.rate:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + 1.0 / self.rate
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def _complete(client, key, request, cache, semaphore, limiter, max_retries, stats):
+    answer = cache.get(key) if cache else None
+    if answer is not None:
+        stats["cache_hits"] += 1
+        return answer
+
+    async with semaphore:
+        for attempt in range(max_retries + 1):
+            await limiter.wait()
+            try:
+                stats["api_calls"] += 1
+                response = await client.chat.completions.create(**request)
+                break
+            except RETRYABLE_ERRORS:
+                if attempt == max_retries:
+                    raise
+                stats["retries"] += 1
+                # Exponential backoff with jitter
+                await asyncio.sleep(min(30.0, 0.5 * 2 ** attempt) * (0.5 + random.random()))
+
+    answer = response.choices[0].message.content.strip()
+    if cache:
+        cache.put(key, answer)
+    return answer
+
+
+async def run_chat_batch(requests, concurrency=8, requests_per_second=None, max_retries=4,
+                         cache_dir=LLM_CACHE_DIR, client=None, base_url=None, return_exceptions=False):
+    """
+    Runs many chat-completion requests concurrently and returns
+    (answers, stats) with answers in request order. Duplicate requests are
+    sent once and earlier answers come from the disk cache; at most
+    `concurrency` calls are in flight and at most `requests_per_second`
+    start each second. With `return_exceptions`, a request that still
+    fails after its retries gets its exception in place of the answer and
+    the others carry on. Point `base_url` at a local stand-in server to
+    measure throughput offline.
+    """
+    stats = {"requests": len(requests), "unique": 0, "cache_hits": 0, "api_calls": 0, "retries": 0}
+    if not requests:
+        # Nothing to send, so no client (or API key) is needed
+        return [], dict(stats, seconds=0.0, requests_per_second=None)
+
+    owns_client = client is None
+    if owns_client:
+        client = openai.AsyncOpenAI(api_key=_api_key(), base_url=base_url, max_retries=0)
+    cache = ResponseCache(cache_dir) if cache_dir else None
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(requests_per_second)
+
+    keys = [ResponseCache.key(request) for request in requests]
+    unique = dict(zip(keys, requests))
+    stats["unique"] = len(unique)
+
+    start = time.perf_counter()
+    try:
+        results = await asyncio.gather(*[
+            _complete(client, key, request, cache, semaphore, limiter, max_retries, stats)
+            for key, request in unique.items()
+        ], return_exceptions=return_exceptions)
+    finally:
+        if owns_client:
+            await client.close()
+    stats["seconds"] = time.perf_counter() - start
+    stats["requests_per_second"] = len(requests) / stats["seconds"] if stats["seconds"] else None
+
+    by_key = dict(zip(unique, results))
+    return [by_key[key] for key in keys], stats
+
+
+async def summarize_zone_stats_batch_async(items, **batch_kwargs):
+    """
+    Summarizes many (zone, hour, avg, max_val, count, sensor_type) tuples.
+    Returns (summaries, stats); see run_chat_batch for the options.
+    """
+    requests = [zone_summary_request(*item) for item in items]
+    return await run_chat_batch(requests, **batch_kwargs)
+
+
+@profiled()
+def summarize_zone_stats_batch(items, **batch_kwargs):
+    """Blocking wrapper around summarize_zone_stats_batch_async."""
+    return asyncio.run(summarize_zone_stats_batch_async(items, **batch_kwargs))
+
+
+# === Bulk Tweet Verification ===
+TWEET_MODEL = "gpt-3.5-turbo"
+TWEET_SYSTEM_PROMPT = "You are a misinformation expert for city emergencies."
+
+
+def normalize_tweet(text):
+    """Lower-cased, whitespace-collapsed text used as the verdict cache key."""
+    return re.sub(r"\s+", " ", str(text)).strip().lower()
+
+
+def bulk_tweet_request(texts):
+    numbered = "\n".join(f"{i}. {text}" for i, text in enumerate(texts, start=1))
+    prompt = (
+        "Classify each numbered tweet as 'Real' or 'Fake' and explain in 1 line.\n"
+        'Answer with a JSON array only, one object per tweet: '
+        '[{"id": 1, "verdict": "Real", "reason": "..."}]\n\n'
+        f"Tweets:\n{numbered}"
+    )
+    return {
+        "model": TWEET_MODEL,
+        "messages": [
+            {"role": "system", "content": TWEET_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": 60 * len(texts) + 20,
+        "temperature": 0.3,
+    }
+
+
+def parse_bulk_verdicts(content, n):
+    """
+    Extracts {"verdict", "reason"} for tweets 1..n from a bulk answer.
+    Accepts the requested JSON array or "1. Real - reason" style lines;
+    tweets missing from the answer come back as None.
+    """
+    verdicts = [None] * n
+    match = re.search(r"\[.*\]", content, re.DOTALL)
+    try:
+        items = json.loads(match.group(0)) if match else []
+    except ValueError:
+        items = []
+    for item in items if isinstance(items, list) else []:
+        try:
+            i = int(item["id"]) - 1
+            verdict = str(item["verdict"]).strip().capitalize()
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= i < n and verdict in ("Real", "Fake"):
+            verdicts[i] = {"verdict": verdict, "reason": str(item.get("reason", "")).strip()}
+
+    for line in content.splitlines():
+        line_match = re.match(r"\s*(\d+)[.):]\s*(real|fake)\b\W*(.*)", line, re.IGNORECASE)
+        if line_match:
+            i = int(line_match.group(1)) - 1
+            if 0 <= i < n and verdicts[i] is None:
+                verdicts[i] = {"verdict": line_match.group(2).capitalize(), "reason": line_match.group(3).strip()}
+    return verdicts
+
+
+async def classify_tweets_bulk_async(tweets, batch_size=25, cache_dir=VERDICT_CACHE_DIR, **batch_kwargs):
+    """
+    Verifies many tweets with few LLM calls. Tweets are normalized and
+    deduplicated, cached verdicts are reused, and the remaining texts are
+    packed `batch_size` per request and sent through run_chat_batch (so
+    `concurrency`, `requests_per_second`, `base_url` etc. apply). Each
+    answered request is cached even when others fail; tweets of failed
+    requests get None and are counted in stats["failed_requests"] (if
+    every request fails, the first error is raised).
+    Returns ({"verdict", "reason"} or None per tweet, stats).
+    """
+    cache = ResponseCache(cache_dir) if cache_dir else None
+    normalized = [normalize_tweet(tweet) for tweet in tweets]
+    keys = {text: ResponseCache.key({"model": TWEET_MODEL, "tweet": text}) for text in set(normalized)}
+
+    verdicts = {}
+    for text, key in keys.items():
+        cached = cache.get(key) if cache else None
+        if cached is not None:
+            verdicts[text] = cached
+
+    pending = sorted(text for text in keys if text not in verdicts)
+    chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    answers, stats = await run_chat_batch([bulk_tweet_request(chunk) for chunk in chunks],
+                                          cache_dir=None, return_exceptions=True, **batch_kwargs)
+
+    failed = [answer for answer in answers if isinstance(answer, BaseException)]
+    if failed and len(failed) == len(answers):
+        raise failed[0]  # nothing got through (bad key, server down): report it rather than all-None
+    for chunk, answer in zip(chunks, answers):
+        if isinstance(answer, BaseException):
+            continue
+        for text, verdict in zip(chunk, parse_bulk_verdicts(answer, len(chunk))):
+            if verdict is not None:
+                verdicts[text] = verdict
+                if cache:
+                    cache.put(keys[text], verdict)
+
+    stats.update(tweets=len(tweets), unique_tweets=len(keys), verdict_cache_hits=len(keys) - len(pending),
+                 failed_requests=len(failed))
+    return [verdicts.get(text) for text in normalized], stats
+
+
+@profiled()
+def classify_tweets_bulk(tweets, **kwargs):
+    """Blocking wrapper around classify_tweets_bulk_async."""
+    return asyncio.run(classify_tweets_bulk_async(tweets, **kwargs))
+
+
+@profiled()
+def classify_suspicious_tweets(result_df, **kwargs):
+    """
+    Sends only the tweets detect_fake_news flagged as is_potential_fake to
+    the LLM, so the number of calls scales with suspicious content rather
+    than stream volume. Adds llm_verdict / llm_reason columns (empty for
+    tweets that were not sent) and returns (result_df, stats).
+    """
+    result_df = result_df.copy()
+    suspicious = result_df.index[result_df["is_potential_fake"]]
+    verdicts, stats = classify_tweets_bulk(result_df.loc[suspicious, "text"].tolist(), **kwargs)
+    result_df["llm_verdict"] = None
+    result_df["llm_reason"] = None
+    result_df.loc[suspicious, "llm_verdict"] = [v["verdict"] if v else None for v in verdicts]
+    result_df.loc[suspicious, "llm_reason"] = [v["reason"] if v else None for v in verdicts]
+    return result_df, stats
@@ -1,8 +1,11 @@
 import pandas as pd
 import numpy as np
-from datetime import timedelta
 from scipy.spatial import cKDTree
 
+from utils.facility_index import parse_facilities
+from utils.parallel import SharedArrays, map_shared, resolve_workers, split_ranges
+from utils.profiling import profiled
+
 def latlon_to_cartesian(lat, lon):
     EARTH_RADIUS_KM = 6371.0
     lat_rad = np.radians(lat)
@@ -12,67 +15,205 @@ def latlon_to_cartesian(lat, lon):
     z = EARTH_RADIUS_KM * np.sin(lat_rad)
     return np.vstack((x, y, z)).T
 
-def process_data(city_map, energy_consumption, disaster_events):
-    # 1. Extract building_id, coordinates, and type from GeoJSON
-    building_coords = []
-    for feature in city_map["features"]:
-        props = feature["properties"]
-        coords = feature["geometry"]["coordinates"]
-        if props["name"].startswith("Location"):
-            building_id = int(props["name"].replace("Location ", ""))
-            building_coords.append({
-                "building_id": building_id,
-                "longitude": coords[0],
-                "latitude": coords[1],
-                "type": props.get("type", "unknown")
-            })
-
-    buildings_df = pd.DataFrame(building_coords)
+@profiled()
+def match_event_windows(tree, located, seg_codes, row_hours, event_lat, event_lon, event_times,
+                        radius_km=5, window=np.timedelta64(1, "h")):
+    """
+    Finds every (event, building-hour row) pair where the building is within
+    radius_km of the event and the hour is within +/- window of its time.
 
-    # 2. Merge energy data with building info (including type)
-    energy = energy_consumption.merge(buildings_df, on="building_id", how="left")
+    `tree` indexes the located buildings, `located` maps tree positions to
+    building codes, and `seg_codes` gives the building code of each row;
+    rows must be sorted by (building, hour). One query_ball_point call finds
+    the buildings of all events, and the time window is resolved with
+    searchsorted on a combined (building, seconds) key.
+    Returns (event_idx, row_idx) ordered by event, then row.
+    """
+    empty = np.empty(0, dtype=np.intp)
+    ok = ~(np.isnan(event_lat) | np.isnan(event_lon) | np.isnat(event_times))
+    events = np.flatnonzero(ok)
+    if len(events) == 0 or len(located) == 0 or len(row_hours) == 0:
+        return empty, empty
 
-    # 3. Aggregate energy consumption hourly
-    energy["hour"] = energy["timestamp"].dt.floor("H")
-    energy_hourly = energy.groupby(["building_id", "hour"]).agg(
+    # Buildings near each event
+    neighbours = tree.query_ball_point(latlon_to_cartesian(event_lat[events], event_lon[events]), r=radius_km)
+    lengths = np.fromiter((len(n) for n in neighbours), dtype=np.intp, count=len(events))
+    if lengths.sum() == 0:
+        return empty, empty
+    pair_event = np.repeat(events, lengths)
+    pair_building = located[np.concatenate([n for n in neighbours if n]).astype(np.intp)]
+
+    # Seconds relative to the first hour keep (building, time) keys within int64
+    ns_per_s = 1_000_000_000
+    row_ns = row_hours.astype(np.int64)
+    origin = row_ns.min()
+    row_s = (row_ns - origin) // ns_per_s
+    span = int(row_s.max()) + 1
+    row_key = seg_codes.astype(np.int64) * span + row_s
+
+    event_ns = event_times.astype(np.int64) - origin
+    window_ns = window.astype("timedelta64[ns]").astype(np.int64)
+    low = -((window_ns - event_ns[pair_event]) // ns_per_s)  # ceil((t - w) / 1s)
+    high = (event_ns[pair_event] + window_ns) // ns_per_s
+    low = np.clip(low, 0, span)
+    high = np.clip(high, -1, span - 1)
+
+    base = pair_building.astype(np.int64) * span
+    lo = np.searchsorted(row_key, base + low, side="left")
+    hi = np.searchsorted(row_key, base + high, side="right")
+    counts = np.maximum(hi - lo, 0)
+
+    # Expand each [lo, hi) range into row indices
+    total = counts.sum()
+    ends = np.cumsum(counts)
+    row_idx = np.repeat(lo - (ends - counts), counts) + np.arange(total)
+    event_idx = np.repeat(pair_event, counts)
+    order = np.lexsort((row_idx, event_idx))
+    return event_idx[order], row_idx[order]
+
+def _hourly_shard(task, arrays):
+    # Hourly means for one contiguous block of buildings (rows grouped by
+    # building, in their original order within each building)
+    start, stop = task
+    shard = pd.DataFrame({name: arrays[name][start:stop]
+                          for name in ("building_id", "hour", "energy_kwh", "latitude", "longitude", "type_code")})
+    return shard.groupby(["building_id", "hour"]).agg(
         energy_kwh=("energy_kwh", "mean"),
         latitude=("latitude", "first"),
         longitude=("longitude", "first"),
-        type=("type", "first")
+        type_code=("type_code", "first")
     ).reset_index()
 
-    # 4. Coordinate conversion
-    coords = latlon_to_cartesian(energy_hourly["latitude"], energy_hourly["longitude"])
-    tree = cKDTree(coords)
-
-    # 5. Match disasters with affected buildings
-    affected_records = []
-    for _, row in disaster_events.iterrows():
-        event_time = row["date"]
-        event_lat = row["latitude"]
-        event_lon = row["longitude"]
-        event_type = row["disaster_type"]
-        event_id = row["event_id"]
-
-        event_coord = latlon_to_cartesian([event_lat], [event_lon])[0]
-        idxs = tree.query_ball_point(event_coord, r=5)  # 5km radius
-
-        time_window_start = event_time - timedelta(hours=1)
-        time_window_end = event_time + timedelta(hours=1)
-
-        affected = energy_hourly.iloc[idxs]
-        affected = affected[
-            (affected["hour"] >= time_window_start) &
-            (affected["hour"] <= time_window_end)
-        ].copy()
-        affected["event_id"] = event_id
-        affected["event_type"] = event_type
-        affected["event_time"] = event_time
-
-        affected_records.append(affected)
-
-    # 6. Combine affected records
-    affected_df = pd.concat(affected_records, ignore_index=True)
+def _aggregate_hourly_parallel(energy, workers):
+    """
+    Same frame as the serial hourly groupby, computed per block of buildings
+    in a process pool. Rows are stably sorted by building so each group sees
+    its readings in the original order, and the blocks cover ascending
+    building ranges, so concatenating them keeps the (building, hour) order.
+    """
+    building_codes, _ = pd.factorize(energy["building_id"], sort=True)
+    order = np.argsort(building_codes, kind="stable")
+    order = order[building_codes[order] >= 0]  # missing ids are dropped by groupby
+    type_codes, type_labels = pd.factorize(energy["type"])
+
+    sorted_codes = building_codes[order]
+    bounds = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    tasks = []
+    for lo, hi in split_ranges(0, len(bounds), workers):
+        start = bounds[lo]
+        stop = bounds[hi] if hi < len(bounds) else len(order)
+        tasks.append((int(start), int(stop)))
+
+    with SharedArrays({
+        "building_id": energy["building_id"].to_numpy()[order],
+        "hour": energy["hour"].to_numpy()[order],
+        "energy_kwh": energy["energy_kwh"].to_numpy(dtype=np.float64)[order],
+        "latitude": energy["latitude"].to_numpy(dtype=np.float64)[order],
+        "longitude": energy["longitude"].to_numpy(dtype=np.float64)[order],
+        "type_code": np.where(type_codes >= 0, type_codes, np.nan)[order],  # NaN so "first" skips it
+    }) as shared:
+        shards = map_shared(_hourly_shard, tasks, shared, workers)
+
+    hourly = pd.concat(shards, ignore_index=True)
+    codes = hourly.pop("type_code").fillna(-1).to_numpy(dtype=np.int64)
+    hourly["type"] = pd.Series(pd.Categorical.from_codes(codes, type_labels)).astype(energy["type"].dtype)
+    return hourly
+
+def _match_event_shard(task, arrays):
+    # Window matches for one contiguous block of events; event indices are
+    # shifted back to positions in the full event table.
+    start, stop, radius_km, window = task
+    tree = cKDTree(arrays["building_xyz"])
+    event_idx, row_idx = match_event_windows(
+        tree, arrays["located"], arrays["seg_codes"], arrays["row_hours"],
+        arrays["event_lat"][start:stop], arrays["event_lon"][start:stop], arrays["event_times"][start:stop],
+        radius_km, window,
+    )
+    return event_idx + start, row_idx
+
+def _match_event_windows_parallel(building_xyz, located, seg_codes, row_hours, event_lat, event_lon,
+                                  event_times, workers, radius_km=5, window=np.timedelta64(1, "h")):
+    """
+    match_event_windows over blocks of events in a process pool. Each block
+    comes back ordered by (event, row) and the blocks cover ascending event
+    ranges, so their concatenation is exactly the serial result.
+    """
+    tasks = [(start, stop, radius_km, window) for start, stop in split_ranges(0, len(event_lat), workers * 4)]
+    with SharedArrays({
+        "building_xyz": building_xyz, "located": located, "seg_codes": seg_codes, "row_hours": row_hours,
+        "event_lat": event_lat, "event_lon": event_lon, "event_times": event_times,
+    }) as shared:
+        shards = map_shared(_match_event_shard, tasks, shared, workers)
+    if not shards:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+    return (np.concatenate([event_idx for event_idx, _ in shards]),
+            np.concatenate([row_idx for _, row_idx in shards]))
+
+# Energy rows per worker below which process_data stays serial. Measured
+# pool overhead is ~0.13 s plus ~0.3 us per row (the hourly frames come back
+# pickled) against ~0.85 us per row serially, so a worker only pays off
+# well past 1M rows.
+PARALLEL_MIN_ROWS = 1_000_000
+
+@profiled()
+def process_data(city_map, energy_consumption, disaster_events, workers=None):
+    """
+    Energy impact of each disaster on nearby buildings. workers > 1 (or 0
+    for every core; None reads CRISISVERSE_WORKERS) runs the hourly
+    aggregation by block of buildings and the event matching by block of
+    events in a process pool, with the same result as the serial path.
+    """
+    workers = resolve_workers(workers, len(energy_consumption), min_rows=PARALLEL_MIN_ROWS)
+
+    # 1. Building coordinates and type from the parsed GeoJSON ("Location <id>" features)
+    buildings_df = parse_facilities(city_map).dropna(subset=["building_id"])
+    buildings_df = buildings_df[["building_id", "longitude", "latitude", "type"]].reset_index(drop=True)
+    buildings_df["building_id"] = buildings_df["building_id"].astype(np.int64)
+
+    # 2. Merge energy data with building info (including type)
+    energy = energy_consumption.merge(buildings_df, on="building_id", how="left")
+
+    # 3. Aggregate energy consumption hourly
+    energy["hour"] = energy["timestamp"].dt.floor("h")
+    if workers > 1:
+        energy_hourly = _aggregate_hourly_parallel(energy, workers)
+    else:
+        energy_hourly = energy.groupby(["building_id", "hour"]).agg(
+            energy_kwh=("energy_kwh", "mean"),
+            latitude=("latitude", "first"),
+            longitude=("longitude", "first"),
+            type=("type", "first")
+        ).reset_index()
+
+    # 4. Spatial index over distinct buildings (rows are sorted by building, hour)
+    row_building = energy_hourly["building_id"].to_numpy()
+    seg_starts = np.flatnonzero(np.r_[True, row_building[1:] != row_building[:-1]])
+    seg_codes = np.repeat(np.arange(len(seg_starts)), np.diff(np.r_[seg_starts, len(row_building)]))
+    bld_lat = energy_hourly["latitude"].to_numpy(dtype=np.float64)[seg_starts]
+    bld_lon = energy_hourly["longitude"].to_numpy(dtype=np.float64)[seg_starts]
+    located = np.flatnonzero(~(np.isnan(bld_lat) | np.isnan(bld_lon)))
+    building_xyz = latlon_to_cartesian(bld_lat[located], bld_lon[located])
+
+    # 5. Match all disasters with affected building-hours in one batch
+    event_time = pd.to_datetime(disaster_events["date"])
+    match_args = (
+        seg_codes,
+        energy_hourly["hour"].to_numpy(dtype="datetime64[ns]"),
+        disaster_events["latitude"].to_numpy(dtype=np.float64),
+        disaster_events["longitude"].to_numpy(dtype=np.float64),
+        event_time.to_numpy(dtype="datetime64[ns]"),
+    )
+    if workers > 1:
+        event_idx, row_idx = _match_event_windows_parallel(building_xyz, located, *match_args, workers)
+    else:
+        event_idx, row_idx = match_event_windows(cKDTree(building_xyz), located, *match_args)
+
+    # 6. Build affected records with one gather instead of per-event copies
+    affected_df = energy_hourly.take(row_idx).reset_index(drop=True)
+    affected_df["event_id"] = disaster_events["event_id"].to_numpy()[event_idx]
+    affected_df["event_type"] = disaster_events["disaster_type"].to_numpy()[event_idx]
+    affected_df["event_time"] = event_time.to_numpy()[event_idx]
 
     # 7. Compare with average energy per building
     building_avg = energy_hourly.groupby("building_id")["energy_kwh"].mean().reset_index(name="avg_energy")
@@ -0,0 +1,440 @@
+import argparse
+import os
+import pickle
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from data_loader import SCHEMAS, iter_csv_tail, read_csv_header
+from utils.anomaly_detector import StreamingZScoreDetector
+from utils.cache_utils import estimate_size
+from utils.fake_news_utils import detect_fake_news, extract_sensor_disasters
+from utils.zone_mapper import get_zone_index
+from utils.zone_store import ZoneAggregateStore
+
+SENSOR_PATH = "data/essential_data/sensor_readings.csv"
+TWEETS_PATH = "data/essential_data/social_media_stream.csv"
+DISASTER_PATH = "data/essential_data/disaster_events.csv"
+STREAM_STATE_PATH = os.path.join("data", ".cache", "stream_state.pkl")
+
+STAGES = ["clean", "zone", "fake_news", "publish"]
+EVENT_COLUMNS = ["date", "latitude", "longitude", "disaster_type"]
+RECENT_ROWS = 500
+
+
+# === Sources ===
+class FileTailSource:
+    """
+    Rows appended to a CSV since the last poll, read with iter_csv_tail from
+    a byte offset. A file that was replaced rather than appended to (new
+    header or shorter than the offset) is read again from the start.
+    """
+
+    def __init__(self, path, batch_rows=10_000, offset=0, header=None):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.offset = offset
+        self.header = header
+        self.schema = SCHEMAS.get(os.path.basename(path), {})
+
+    def poll(self):
+        if not os.path.exists(self.path):
+            return None
+        names, _ = read_csv_header(self.path)
+        if names != self.header or self.offset > os.path.getsize(self.path):
+            self.header, self.offset = names, 0
+
+        read_csv_kwargs = {"dtype": self.schema.get("dtype", {})}
+        parse_dates = [c for c in self.schema.get("parse_dates", []) if c in names]
+        if parse_dates:
+            read_csv_kwargs["parse_dates"] = parse_dates
+        for chunk, offset in iter_csv_tail(self.path, self.offset, self.batch_rows, **read_csv_kwargs):
+            self.offset = offset
+            return chunk
+        return None
+
+    def position(self):
+        return {"offset": self.offset, "header": self.header}
+
+
+class QueueSource:
+    """Frames (or lists of row dicts) pushed onto a local queue.Queue by a producer."""
+
+    def __init__(self, source_queue, batch_rows=10_000):
+        self.queue = source_queue
+        self.batch_rows = batch_rows
+
+    def poll(self):
+        frames, rows = [], 0
+        while rows < self.batch_rows:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            frame = item if isinstance(item, pd.DataFrame) else pd.DataFrame(item)
+            frames.append(frame)
+            rows += len(frame)
+        return pd.concat(frames, ignore_index=True) if frames else None
+
+    def position(self):
+        return None
+
+
+# === Published State ===
+class StreamState:
+    """
+    Everything the runner publishes and needs to resume: the zone aggregate
+    store, detector buffers, tweet dedup hashes, source positions, recent
+    anomalies / suspicious tweets and the last stage metrics. Saved as one
+    pickle, so positions and results always describe the same batches. Only
+    the publish stage changes it, so a save never sees a batch half applied.
+    """
+
+    def __init__(self):
+        self.store = ZoneAggregateStore()
+        self.detector = None
+        self.seen_texts = set()
+        self.positions = {}
+        self.recent_anomalies = pd.DataFrame()
+        self.recent_fakes = pd.DataFrame()
+        self.tweet_totals = {"verified": 0, "potential_fake": 0}
+        self.metrics = pd.DataFrame()
+        self.updated_at = None
+
+    def __sizeof__(self):
+        # Lets the dashboard's state cache hold it to its byte budget
+        parts = [self.store, self.detector, self.seen_texts, self.recent_anomalies, self.recent_fakes, self.metrics]
+        return object.__sizeof__(self) + sum(estimate_size(part) for part in parts)
+
+    def save(self, path=STREAM_STATE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path=STREAM_STATE_PATH):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+# === Stage Plumbing ===
+class StageMetrics:
+    def __init__(self, name, latency_samples=2000):
+        self.name = name
+        self.batches = 0
+        self.rows_in = 0
+        self.rows_out = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.latencies = deque(maxlen=latency_samples)
+        self.lock = threading.Lock()
+
+    def record(self, rows_in, rows_out, busy, blocked, latency):
+        with self.lock:
+            self.batches += 1
+            self.rows_in += rows_in
+            self.rows_out += rows_out
+            self.busy += busy
+            self.blocked += blocked
+            self.latencies.append(latency)
+
+    def snapshot(self):
+        with self.lock:
+            latencies = np.array(self.latencies)
+            p50, p95 = np.percentile(latencies, [50, 95]) if len(latencies) else (np.nan, np.nan)
+            return {
+                "batches": self.batches,
+                "rows_in": self.rows_in,
+                "rows_out": self.rows_out,
+                "busy_s": round(self.busy, 4),
+                "rows_per_s": round(self.rows_in / self.busy, 1) if self.busy else np.nan,
+                # Time spent waiting for room downstream; grows when a later stage falls behind
+                "blocked_s": round(self.blocked, 4),
+                # Ingest-to-end-of-stage latency
+                "latency_p50_ms": round(float(p50) * 1000, 2),
+                "latency_p95_ms": round(float(p95) * 1000, 2),
+            }
+
+
+class Stage(threading.Thread):
+    """
+    Worker that applies `func(kind, frame, position, ingested_at)` to each micro-batch from `inbox`
+    and hands the result to `outbox`. Queues are bounded, so a slow stage
+    blocks the ones before it and, ultimately, the source reader.
+    """
+
+    def __init__(self, name, func, inbox, outbox=None):
+        super().__init__(name=f"stream-{name}", daemon=True)
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.metrics = StageMetrics(name)
+        self.error = None
+
+    def run(self):
+        while True:
+            item = self.inbox.get()
+            if item is None:
+                break
+            if self.error is not None:
+                continue  # keep draining so upstream stages never block on a dead stage
+            kind, frame, ingested_at, position = item
+            try:
+                start = time.perf_counter()
+                result = self.func(kind, frame, position, ingested_at)
+                busy = time.perf_counter() - start
+            except Exception as exc:
+                self.error = exc
+                continue
+
+            blocked = 0.0
+            if self.outbox is not None:
+                start = time.perf_counter()
+                self.outbox.put((kind, result, ingested_at, position))
+                blocked = time.perf_counter() - start
+            self.metrics.record(len(frame), len(result), busy, blocked, time.monotonic() - ingested_at)
+
+        if self.outbox is not None:
+            self.outbox.put(None)
+
+
+def _text_hashes(frame):
+    return pd.util.hash_array(frame["text"].astype(str).to_numpy(dtype=object))
+
+
+# === Runner ===
+class StreamRunner:
+    """
+    Micro-batch pipeline over the sensor and social-media feeds:
+
+        source -> clean -> zone -> fake_news -> publish
+
+    Each stage runs in its own thread; sensor and tweet batches share the
+    chain, so sensor-derived events seen before a tweet batch are available
+    when it is matched. Results go to a StreamState that the dashboard reads.
+    Everything the state keeps across batches (detector buffers, dedup
+    hashes, positions) is updated in publish, on the thread that saves it.
+    """
+
+    def __init__(self, sources, disaster_df, state=None, queue_size=4, state_path=STREAM_STATE_PATH,
+                 save_interval=2.0, window=10, threshold=2, time_window_hours=3, distance_km=20,
+                 event_horizon_hours=24):
+        self.sources = sources
+        self.state = state if state is not None else StreamState()
+        self.queue_size = queue_size
+        self.state_path = state_path
+        self.save_interval = save_interval
+        self.window = window
+        self.threshold = threshold
+        self.time_window_hours = time_window_hours
+        self.distance_km = distance_km
+        self.event_horizon = pd.Timedelta(hours=event_horizon_hours)
+
+        self.zone_index = get_zone_index(disaster_df)
+        self.static_events = disaster_df[EVENT_COLUMNS].dropna(subset=["latitude", "longitude"])
+        self.sensor_events = []
+        self._events = None
+        # Hashes of tweets cleaned but not yet published; checked with
+        # state.seen_texts so duplicates are caught while batches are in flight
+        self._pending_texts = set()
+        self._texts_lock = threading.Lock()
+        self.ingest_metrics = StageMetrics("ingest")
+        # Detection runs inside publish (see anomaly) but is reported as its own stage
+        self.anomaly_metrics = StageMetrics("anomaly")
+        self.stages = []
+        self._last_save = 0.0
+
+        for kind, source in sources.items():
+            position = self.state.positions.get(kind)
+            if position and isinstance(source, FileTailSource):
+                source.offset, source.header = position["offset"], position["header"]
+
+    # --- stages ---
+    def clean(self, kind, frame, position, ingested_at):
+        # Row-level checks only: IQR bounds need the whole distribution, so
+        # they are not recomputed per micro-batch.
+        frame = frame.dropna(subset=["latitude", "longitude"])
+        frame = frame.assign(timestamp=pd.to_datetime(frame["timestamp"], errors="coerce"))
+        if kind == "sensors":
+            frame = frame[frame["status"] == "active"].dropna(subset=["reading_value"])
+            return frame
+        # Duplicate texts are dropped across batches, not just within one
+        hashes = _text_hashes(frame)
+        fresh = ~pd.Series(hashes).duplicated().to_numpy()
+        with self._texts_lock:
+            seen, pending = self.state.seen_texts, self._pending_texts
+            fresh &= np.fromiter((h not in seen and h not in pending for h in hashes), dtype=bool, count=len(hashes))
+            pending.update(hashes[fresh].tolist())
+        return frame[fresh]
+
+    def zone(self, kind, frame, position, ingested_at):
+        frame = frame.copy()
+        frame["zone_id"] = self.zone_index.predict(frame["latitude"], frame["longitude"])
+        return frame
+
+    def anomaly(self, frame):
+        # Runs inside publish, so the detector buffers only ever hold published readings
+        detector = self.state.detector
+        if detector is None:
+            key = "sensor_id" if "sensor_id" in frame.columns else "_series"
+            detector = self.state.detector = StreamingZScoreDetector(self.window, self.threshold, key)
+        if detector.key == "_series":
+            # No sensor ids: one rolling window over all readings, as detect_zscore_anomalies(by=None)
+            return detector.update(frame.assign(_series=0)).drop(columns="_series")
+        return detector.update(frame)
+
+    def fake_news(self, kind, frame, position, ingested_at):
+        if kind == "sensors":
+            events = extract_sensor_disasters(frame)[EVENT_COLUMNS]
+            if len(events):
+                self.sensor_events.append(events)
+                self._events = None
+            return frame
+        if frame.empty:
+            return frame.assign(detected_disaster_type=pd.Series(dtype=object),
+                                is_verified_event=pd.Series(dtype=bool), is_potential_fake=pd.Series(dtype=bool))
+
+        # Sensor events older than the horizon can no longer match new tweets
+        horizon = frame["timestamp"].max() - self.event_horizon
+        if pd.notna(horizon) and self.sensor_events:
+            kept = [e[e["date"] >= horizon] for e in self.sensor_events]
+            kept = [e for e in kept if len(e)]
+            if sum(map(len, kept)) != sum(map(len, self.sensor_events)):
+                self.sensor_events, self._events = kept, None
+        if self._events is None:
+            self._events = pd.concat([self.static_events] + self.sensor_events, ignore_index=True)
+        return detect_fake_news(frame.copy(), self._events, self.time_window_hours, self.distance_km)
+
+    def publish(self, kind, frame, position, ingested_at):
+        state = self.state
+        if kind == "sensors":
+            start = time.perf_counter()
+            rows_in = len(frame)
+            frame = self.anomaly(frame)
+            self.anomaly_metrics.record(rows_in, len(frame), time.perf_counter() - start, 0.0,
+                                        time.monotonic() - ingested_at)
+            state.store.append_sensors(frame, zone_col="zone_id")
+            anomalies = frame[frame["anomaly_flag"]]
+            if len(anomalies):
+                state.recent_anomalies = pd.concat([state.recent_anomalies, anomalies]).tail(RECENT_ROWS)
+        else:
+            hashes = _text_hashes(frame).tolist()
+            with self._texts_lock:
+                state.seen_texts.update(hashes)
+                self._pending_texts.difference_update(hashes)
+            state.store.append_tweets(frame, zone_col="zone_id")
+            verified = int(frame["is_verified_event"].sum())
+            state.tweet_totals["verified"] += verified
+            state.tweet_totals["potential_fake"] += len(frame) - verified
+            fakes = frame[frame["is_potential_fake"]]
+            if len(fakes):
+                state.recent_fakes = pd.concat([state.recent_fakes, fakes]).tail(RECENT_ROWS)
+        if position is not None:
+            state.positions[kind] = position
+        if self.state_path and time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+        return frame
+
+    # --- control ---
+    def metrics(self):
+        """
+        Per-stage throughput, busy/blocked time, queue depth and latency.
+        The anomaly row is timed inside publish (whose busy time includes
+        it) and has no queue of its own.
+        """
+        rows = {"ingest": self.ingest_metrics.snapshot()}
+        for stage in self.stages:
+            if stage.metrics.name == "publish":
+                rows["anomaly"] = self.anomaly_metrics.snapshot()
+            rows[stage.metrics.name] = dict(stage.metrics.snapshot(), queue_depth=stage.inbox.qsize())
+        return pd.DataFrame.from_dict(rows, orient="index")
+
+    def save(self):
+        self.state.metrics = self.metrics()
+        self.state.updated_at = pd.Timestamp.now()
+        self.state.save(self.state_path)
+        self._last_save = time.monotonic()
+
+    def run(self, duration=None, poll_interval=1.0, until_drained=False):
+        """
+        Reads micro-batches until `duration` seconds have passed, the sources
+        run dry (with until_drained) or the process is interrupted, then
+        drains the pipeline and saves the state.
+        """
+        funcs = [self.clean, self.zone, self.fake_news, self.publish]
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in funcs]
+        self.stages = [
+            Stage(name, func, queues[i], queues[i + 1] if i + 1 < len(queues) else None)
+            for i, (name, func) in enumerate(zip(STAGES, funcs))
+        ]
+        for stage in self.stages:
+            stage.start()
+
+        started = time.monotonic()
+        try:
+            while duration is None or time.monotonic() - started < duration:
+                if any(stage.error for stage in self.stages):
+                    break
+                idle = True
+                for kind, source in self.sources.items():
+                    start = time.perf_counter()
+                    frame = source.poll()
+                    if frame is None or frame.empty:
+                        continue
+                    idle = False
+                    ingested_at = time.monotonic()
+                    busy = time.perf_counter() - start
+                    # Blocks while the first stage's queue is full (backpressure)
+                    queues[0].put((kind, frame, ingested_at, source.position()))
+                    blocked = time.monotonic() - ingested_at
+                    self.ingest_metrics.record(len(frame), len(frame), busy, blocked, blocked)
+                if idle:
+                    if until_drained:
+                        break
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            queues[0].put(None)
+            for stage in self.stages:
+                stage.join()
+
+        for stage in self.stages:
+            if stage.error is not None:
+                raise RuntimeError(f"stream stage {stage.metrics.name!r} failed") from stage.error
+        if self.state_path:
+            self.save()
+        return self.metrics()
+
+
+def build_runner(batch_rows=10_000, queue_size=4, reset=False, state_path=STREAM_STATE_PATH):
+    """Runner over the sensor and tweet files, resumed from the saved state unless `reset`."""
+    state = None
+    if not reset and os.path.exists(state_path):
+        state = StreamState.load(state_path)
+    sources = {
+        "sensors": FileTailSource(SENSOR_PATH, batch_rows),
+        "tweets": FileTailSource(TWEETS_PATH, batch_rows),
+    }
+    disaster_df = pd.read_csv(DISASTER_PATH, parse_dates=["date"])
+    return StreamRunner(sources, disaster_df, state=state, queue_size=queue_size, state_path=state_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream sensor readings and tweets through the analysis pipeline")
+    parser.add_argument("--once", action="store_true", help="process what is in the files now, then stop")
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--batch-rows", type=int, default=10_000)
+    parser.add_argument("--queue-size", type=int, default=4, help="micro-batches buffered between stages")
+    parser.add_argument("--reset", action="store_true", help="ignore the saved stream state")
+    args = parser.parse_args()
+
+    runner = build_runner(args.batch_rows, args.queue_size, reset=args.reset)
+    metrics = runner.run(duration=args.duration, poll_interval=args.poll_interval, until_drained=args.once)
+    print(metrics.to_string())
@@ -0,0 +1,32 @@
+import pandas as pd
+
+from utils.zone_store import ZoneAggregateStore
+
+
+def _readings(rows):
+    return pd.DataFrame(rows, columns=["zone", "timestamp", "sensor_type", "reading_value"])
+
+
+def test_top_sensor_type_counts_readings_across_hours():
+    # 3 humidity readings in one hour, 4 temp readings spread over 4 hours
+    readings = _readings(
+        [("Zone A", "2024-01-01 00:10", "humidity", 1.0)] * 3
+        + [("Zone A", f"2024-01-01 0{h}:10", "temp", 2.0) for h in range(1, 5)]
+    )
+    expected = readings["sensor_type"].value_counts().index[0]
+
+    store = ZoneAggregateStore().append_sensors(readings)
+
+    assert expected == "temp"
+    assert store.zone_stats().loc["Zone A", "top_sensor_type"] == "temp"
+
+
+def test_top_sensor_type_across_appended_batches():
+    store = ZoneAggregateStore()
+    store.append_sensors(_readings([("Zone A", "2024-01-01 00:10", "humidity", 1.0)] * 3))
+    for h in range(1, 5):
+        store.append_sensors(_readings([("Zone A", f"2024-01-01 0{h}:10", "temp", 2.0)]))
+
+    stats = store.zone_stats()
+    assert stats.loc["Zone A", "top_sensor_type"] == "temp"
+    assert stats.loc["Zone A", "sensor_rows"] == 7
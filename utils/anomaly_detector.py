@@ -1,20 +1,144 @@
 # utils/anomaly_detector.py
 
+import numpy as np
 import pandas as pd
 
-def detect_zscore_anomalies(sensor_df, threshold=2):
+from utils.profiling import profiled
+
+@profiled()
+def detect_zscore_anomalies(sensor_df, threshold=2, window=10, by=None):
+    """
+    Flags readings whose z-score against the trailing `window` readings
+    exceeds `threshold`. With `by` (e.g. "sensor_id") the rolling window is
+    computed per group in one grouped pass instead of across all sensors.
+    """
     df = sensor_df.copy()
-    
+
     # Ensure timestamp is datetime
     df["timestamp"] = pd.to_datetime(df["timestamp"])
     df = df.sort_values("timestamp")
 
     # Rolling statistics on the actual reading_value
-    df["rolling_mean"] = df["reading_value"].rolling(window=10, min_periods=1).mean()
-    df["rolling_std"] = df["reading_value"].rolling(window=10, min_periods=1).std()
+    if by is None:
+        rolling = df["reading_value"].rolling(window=window, min_periods=1)
+        df["rolling_mean"] = rolling.mean()
+        df["rolling_std"] = rolling.std()
+    else:
+        rolling = df.groupby(by, sort=False, observed=True)["reading_value"].rolling(window=window, min_periods=1)
+        n_levels = 1 if isinstance(by, str) else len(by)
+        df["rolling_mean"] = rolling.mean().droplevel(list(range(n_levels)))
+        df["rolling_std"] = rolling.std().droplevel(list(range(n_levels)))
 
     # Z-score
     df["z_score"] = (df["reading_value"] - df["rolling_mean"]) / df["rolling_std"]
     df["anomaly_flag"] = df["z_score"].abs() > threshold
 
     return df
+
+
+class StreamingZScoreDetector:
+    """
+    Incremental per-sensor version of detect_zscore_anomalies(by="sensor_id").
+
+    Each sensor keeps its last `window` readings (oldest first) in a row of
+    a buffer array. A micro-batch lays every touched sensor's stored window
+    and new readings end to end and takes the rolling count, sum and sum of
+    squares as differences of prefix sums, which adds each reading and
+    drops the one leaving the window in a single vectorized pass: the cost
+    is O(1) per reading plus O(window) per sensor in the batch. Batches
+    must arrive in timestamp order; readings inside a batch are sorted by
+    timestamp before they are applied.
+    """
+
+    def __init__(self, window=10, threshold=2, key="sensor_id", initial_capacity=1024):
+        self.window = window
+        self.threshold = threshold
+        self.key = key
+        self._index = pd.Index([])
+        self._buffer = np.full((initial_capacity, window), np.nan)
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + self._buffer.nbytes + int(self._index.memory_usage(deep=True))
+
+    @property
+    def n_sensors(self):
+        return len(self._index)
+
+    def _slots_for(self, keys):
+        # Map sensor ids to buffer rows, allocating rows for new sensors
+        slots = self._index.get_indexer(keys)
+        if (slots < 0).any():
+            self._index = self._index.append(pd.Index(pd.unique(keys[slots < 0])))
+            slots = self._index.get_indexer(keys)
+
+        needed = len(self._index)
+        if needed > len(self._buffer):
+            grow = max(needed, 2 * len(self._buffer)) - len(self._buffer)
+            self._buffer = np.vstack((self._buffer, np.full((grow, self.window), np.nan)))
+        return slots
+
+    @profiled(rows_arg=1)
+    def update(self, readings):
+        """
+        Applies a micro-batch of readings and returns it (sorted by timestamp)
+        with rolling_mean, rolling_std, z_score and anomaly_flag columns.
+        """
+        df = readings.copy()
+        if df.empty:
+            for col in ["rolling_mean", "rolling_std", "z_score"]:
+                df[col] = pd.Series(dtype=float)
+            df["anomaly_flag"] = pd.Series(dtype=bool)
+            return df
+
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+        df = df.sort_values("timestamp")
+
+        values = df["reading_value"].to_numpy(dtype=np.float64)
+        slots = self._slots_for(df[self.key].to_numpy())
+        window = self.window
+
+        # One segment per sensor in the batch: its stored window, then its
+        # new readings in timestamp order
+        order = np.argsort(slots, kind="stable")
+        sensors, first, counts = np.unique(slots[order], return_index=True, return_counts=True)
+        lengths = window + counts
+        starts = np.r_[0, np.cumsum(lengths)[:-1]]
+        series = np.empty(lengths.sum())
+        series[starts[:, None] + np.arange(window)] = self._buffer[sensors]
+        at = np.repeat(starts + window - first, counts) + np.arange(len(order))
+        series[at] = values[order]
+
+        # Values are taken relative to the segment's first reading, which
+        # keeps the sums small and makes a constant window's std exactly 0
+        segment = np.repeat(np.arange(len(sensors)), lengths)
+        present = ~np.isnan(series)
+        firsts = np.append(np.flatnonzero(present), len(series))
+        offset = np.append(series, 0.0)[firsts[np.searchsorted(firsts, starts)]]
+        shifted = np.where(present, series - offset[segment], 0.0)
+
+        # NaN slots are either unfilled or missing readings; both are
+        # skipped, as pandas' rolling does.
+        def window_sums(x):
+            # Extended precision (where the platform has it) so differences
+            # of large prefix sums keep the low bits of small windows
+            total = np.r_[0, np.cumsum(x, dtype=np.longdouble)]
+            return total[at + 1] - total[at + 1 - window]
+
+        n = window_sums(present)
+        total, total_sq = window_sums(shifted), window_sums(shifted * shifted)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            m = total / n
+            var = np.maximum(total_sq - total * m, 0.0) / (n - 1)
+        mean = np.empty(len(df))
+        std = np.empty(len(df))
+        mean[order] = m + offset[segment[at]]
+        std[order] = np.where(n > 1, np.sqrt(var), np.nan)
+
+        # Keep each sensor's last `window` values for the next batch
+        self._buffer[sensors] = series[(starts + lengths)[:, None] - window + np.arange(window)]
+
+        df["rolling_mean"] = mean
+        df["rolling_std"] = std
+        df["z_score"] = (df["reading_value"] - df["rolling_mean"]) / df["rolling_std"]
+        df["anomaly_flag"] = df["z_score"].abs() > self.threshold
+        return df
@@ -0,0 +1,212 @@
+# utils/cache_utils.py
+
+import datetime
+import functools
+import hashlib
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# === Fingerprints ===
+# Values whose repr is a complete description of them
+SCALAR_TYPES = (str, bytes, bool, int, float, complex, type(None), np.generic, pd.Timestamp, pd.Timedelta,
+                type(pd.NaT), datetime.date, datetime.time, datetime.timedelta)
+
+
+def fingerprint(obj):
+    """
+    Returns a stable hex digest of `obj`'s content. DataFrames and Series
+    are hashed row-wise with pandas' vectorized hasher, so two frames with
+    the same values, index and dtypes get the same fingerprint. Raises
+    TypeError for types it does not know how to hash by value.
+    """
+    digest = hashlib.sha1()
+    _update(digest, obj)
+    return digest.hexdigest()
+
+
+def _update(digest, obj):
+    if isinstance(obj, pd.DataFrame):
+        digest.update(b"frame")
+        digest.update(repr(list(obj.columns)).encode())
+        digest.update(repr([str(t) for t in obj.dtypes]).encode())
+        digest.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, pd.Series):
+        digest.update(b"series")
+        digest.update(repr((obj.name, str(obj.dtype))).encode())
+        digest.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, pd.Index):
+        digest.update(b"index")
+        digest.update(repr((list(obj.names), str(obj.dtype))).encode())
+        digest.update(pd.util.hash_pandas_object(obj).to_numpy().tobytes())
+    elif isinstance(obj, pd.Categorical):
+        digest.update(b"categorical")
+        digest.update(repr(obj.ordered).encode())
+        _update(digest, obj.categories)
+        digest.update(obj.codes.tobytes())
+    elif isinstance(obj, np.ndarray):
+        digest.update(b"array")
+        digest.update(repr((obj.dtype.str, obj.shape)).encode())
+        digest.update(np.ascontiguousarray(obj).tobytes() if obj.dtype != object else pickle.dumps(obj))
+    elif isinstance(obj, dict):
+        digest.update(b"dict")
+        for key in sorted(obj, key=repr):
+            _update(digest, key)
+            _update(digest, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        digest.update(type(obj).__name__.encode())
+        for item in obj:
+            _update(digest, item)
+    elif isinstance(obj, (set, frozenset)):
+        digest.update(b"set")
+        for item in sorted(fingerprint(item) for item in obj):
+            digest.update(item.encode())
+    elif isinstance(obj, SCALAR_TYPES):
+        digest.update(repr(obj).encode())
+    else:
+        # repr of arbitrary objects often shows only an id, which would
+        # make equal arguments miss (or different ones collide)
+        raise TypeError(f"cannot fingerprint {type(obj).__name__} values")
+
+
+def estimate_size(obj):
+    """Approximate memory held by a cached value, in bytes."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (list, tuple)):
+        return sum(estimate_size(item) for item in obj)
+    if isinstance(obj, dict):
+        return sum(estimate_size(v) for v in obj.values())
+    if isinstance(obj, (set, frozenset)):
+        return sys.getsizeof(obj) + sum(sys.getsizeof(item) for item in obj)
+    # Other objects count through __sizeof__; classes that hold frames or
+    # arrays (TweetQueryView, StreamState, ...) report them there so the
+    # byte budgets apply to them too
+    return sys.getsizeof(obj)
+
+
+def _copy(obj):
+    # Callers often add columns to what they get back; hand out copies so
+    # the cached value is never modified.
+    if isinstance(obj, (pd.DataFrame, pd.Series, np.ndarray)):
+        return obj.copy()
+    if isinstance(obj, dict):
+        return type(obj)((key, _copy(value)) for key, value in obj.items())
+    if type(obj) in (list, tuple):  # namedtuples and other subclasses are returned as they are
+        return type(obj)(_copy(item) for item in obj)
+    return obj
+
+
+# === LRU + TTL Cache ===
+class FingerprintCache:
+    """
+    Thread-safe LRU cache bounded by entry count and total bytes, with an
+    optional time-to-live. Shared by every Streamlit session in the process.
+    """
+
+    def __init__(self, max_entries=32, max_bytes=256 * 2**20, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns (True, value) on a hit and (False, None) otherwise."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[2] > self.ttl:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, value):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return  # larger than the whole budget; not worth evicting everything
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_caches = {}
+
+
+def cached(max_entries=32, max_bytes=256 * 2**20, ttl=None, version=None):
+    """
+    Memoizes a function on the fingerprint of its arguments.
+
+    `version`, if given, is called with the same arguments and its result is
+    added to the key; use it when the output depends on something outside
+    the arguments, e.g. data_loader.data_version() for file loaders.
+    """
+    def decorator(func):
+        # Streamlit re-executes app.py on every rerun, re-applying this
+        # decorator; reuse the cache registered under the same name so the
+        # entries survive the rerun.
+        name = f"{func.__module__}.{func.__qualname__}"
+        cache = _caches.get(name)
+        if cache is None:
+            cache = _caches[name] = FingerprintCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            parts = [name, args, kwargs]
+            if version is not None:
+                parts.append(version(*args, **kwargs))
+            key = fingerprint(parts)
+            hit, value = cache.get(key)
+            if not hit:
+                value = func(*args, **kwargs)
+                cache.put(key, value)
+            return _copy(value)
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def cache_stats():
+    """Hit/miss counts and memory held by every cache created with @cached."""
+    return pd.DataFrame.from_dict({name: c.stats() for name, c in _caches.items()}, orient="index")
@@ -0,0 +1,154 @@
+# utils/charts.py
+
+import functools
+import io
+
+import seaborn as sns
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle
+
+from utils.cache_utils import cached
+from utils.profiling import profiled
+
+CHART_FORMAT = "png"
+CHART_DPI = 100
+
+
+# === Rendering ===
+@profiled()
+def render_figure(fig, fmt=CHART_FORMAT, dpi=CHART_DPI):
+    """
+    Renders a figure to PNG/SVG bytes. Figures here are built with
+    matplotlib.figure.Figure rather than pyplot, so they are never
+    registered with pyplot's figure manager; clearing them after the save
+    frees their artists right away.
+    """
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches="tight")
+    finally:
+        fig.clear()
+    return buffer.getvalue()
+
+
+def cached_chart(max_entries=128, max_bytes=64 * 2**20, ttl=None, version=None, fmt=CHART_FORMAT, dpi=CHART_DPI):
+    """
+    Turns a function that draws into a new Figure into one that returns the
+    rendered bytes, memoized on the fingerprint of its arguments (the small
+    aggregates and labels the chart is drawn from) like @cached.
+    """
+    def decorator(draw):
+        @cached(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl, version=version)
+        @profiled(f"{draw.__module__}.{draw.__qualname__}")
+        @functools.wraps(draw)
+        def render(*args, **kwargs):
+            return render_figure(draw(*args, **kwargs), fmt, dpi)
+        return render
+    return decorator
+
+
+def _figure(figsize):
+    fig = Figure(figsize=figsize)
+    return fig, fig.subplots()
+
+
+# === Charts ===
+@cached_chart()
+def count_bar_chart(counts, title, xlabel, ylabel="Count", palette="viridis", figsize=(4, 2),
+                    rotation=0, title_size=None, label_size=None):
+    """Bar per category from a pre-counted Series (replaces countplot over raw rows)."""
+    fig, ax = _figure(figsize)
+    sns.barplot(x=counts.index.astype(str), y=counts.to_numpy(), hue=counts.index.astype(str),
+                palette=palette, legend=False, ax=ax)
+    ax.set_title(title, fontsize=title_size)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.tick_params(axis="x", rotation=rotation, labelsize=label_size)
+    return fig
+
+
+@cached_chart()
+def donut_chart(counts, title):
+    fig, ax = _figure((5, 5))
+    labels = [f"{label} ({val})" for label, val in zip(counts.index, counts.to_numpy())]
+    ax.pie(
+        counts.to_numpy(), labels=labels, autopct="%1.1f%%", startangle=90, explode=[0.04] * len(labels),
+        shadow=False, colors=sns.color_palette("pastel")[:len(labels)], textprops={"fontsize": 9}
+    )
+    ax.add_artist(Circle((0, 0), 0.65, fc="white"))
+    ax.set_title(title, fontsize=12, weight="bold")
+    return fig
+
+
+@cached_chart()
+def stacked_bar_chart(table, title, xlabel, ylabel="Count"):
+    fig, ax = _figure((4, 2))
+    table.plot(kind="bar", stacked=True, colormap="Set2", ax=ax)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.tick_params(axis="x", rotation=45)
+    return fig
+
+
+@cached_chart()
+def date_histogram(daily_counts, title, bins=60):
+    """Histogram + KDE of event dates drawn from per-day counts used as weights."""
+    fig, ax = _figure((7, 1))
+    sns.histplot(x=daily_counts.index, weights=daily_counts.to_numpy(), bins=bins, kde=True,
+                 color="darkred", ax=ax)
+    ax.set_title(title)
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Count")
+    return fig
+
+
+@cached_chart()
+def heatmap_chart(table, title):
+    fig, ax = _figure((4, 2))
+    sns.heatmap(table, annot=True, cmap="YlOrBr", fmt="d", ax=ax)
+    ax.set_title(title)
+    return fig
+
+
+@cached_chart()
+def series_bar_chart(series, title, ylabel, color):
+    fig, ax = _figure((4, 2))
+    series.plot(kind="bar", ax=ax, color=color)
+    ax.set_ylabel(ylabel, fontsize=9)
+    ax.set_title(title, fontsize=11)
+    ax.tick_params(axis="x", labelsize=8)
+    return fig
+
+
+@cached_chart()
+def trend_chart(table, title, xlabel, ylabel="Count"):
+    fig, ax = _figure((5, 1))
+    table.plot(ax=ax)
+    ax.set_title(title, fontsize=11)
+    ax.set_xlabel(xlabel, fontsize=9)
+    ax.set_ylabel(ylabel, fontsize=9)
+    ax.legend(fontsize=7)
+    return fig
+
+
+@cached_chart()
+def share_pie_chart(counts, title):
+    fig, ax = _figure((2, 2))
+    counts.plot.pie(autopct="%1.1f%%", startangle=90, shadow=False, ax=ax)
+    ax.set_ylabel("")
+    ax.set_title(title, fontsize=11)
+    return fig
+
+
+@cached_chart()
+def box_chart(stats, title, xlabel, ylabel):
+    """Boxplot from per-group summary stats (matplotlib.cbook.boxplot_stats output)."""
+    fig, ax = _figure((7, 3))
+    if stats:
+        ax.bxp(stats, showfliers=True, patch_artist=True,
+               boxprops={"facecolor": sns.color_palette()[0]})
+    ax.set_title(title, fontsize=11)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    return fig
@@ -0,0 +1,70 @@
+# utils/disaster_cube.py
+
+import pandas as pd
+
+from utils.profiling import profiled
+
+CUBE_DIMENSIONS = ["year", "month", "disaster_type", "location", "severity"]
+
+
+@profiled()
+def build_disaster_cube(disaster_df):
+    """
+    Pre-aggregates disaster events over year x month x type x zone x
+    severity. Each cell holds the event count, casualty sum, economic-loss
+    sum and the number of events with a recorded loss (for exact means).
+    """
+    df = pd.DataFrame({
+        "year": disaster_df["date"].dt.year,
+        "month": disaster_df["date"].dt.month,
+        "disaster_type": disaster_df["disaster_type"],
+        "location": disaster_df["location"],
+        "severity": disaster_df["severity"],
+        "casualties": disaster_df["casualties"],
+        "economic_loss_million_usd": disaster_df["economic_loss_million_usd"],
+    })
+    cube = df.groupby(CUBE_DIMENSIONS, observed=True, dropna=False).agg(
+        events=("casualties", "size"),
+        casualties=("casualties", "sum"),
+        loss_sum=("economic_loss_million_usd", "sum"),
+        loss_count=("economic_loss_million_usd", "count"),
+    ).reset_index()
+    return cube
+
+
+def slice_cube(cube, years=None, disaster_types=None, zones=None):
+    """Cells matching the selected years, types and zones (None = all)."""
+    mask = pd.Series(True, index=cube.index)
+    if years is not None:
+        mask &= cube["year"].isin(years)
+    if disaster_types is not None:
+        mask &= cube["disaster_type"].isin(disaster_types)
+    if zones is not None:
+        mask &= cube["location"].isin(zones)
+    return cube[mask]
+
+
+def cube_totals(cells):
+    return {
+        "events": int(cells["events"].sum()),
+        "casualties": cells["casualties"].sum(),
+        "economic_loss": cells["loss_sum"].sum(),
+    }
+
+
+def events_by(cells, dimension):
+    """Event count per value of one dimension, largest first."""
+    return cells.groupby(dimension, observed=True)["events"].sum().sort_values(ascending=False)
+
+
+def monthly_by_type(cells):
+    return cells.pivot_table(index="month", columns="disaster_type", values="events",
+                             aggfunc="sum", fill_value=0, observed=True)
+
+
+def loss_by_type(cells):
+    grouped = cells.groupby("disaster_type", observed=True)[["loss_sum", "loss_count"]].sum()
+    return pd.DataFrame({
+        "total_loss": grouped["loss_sum"],
+        "avg_loss": grouped["loss_sum"] / grouped["loss_count"],
+    })
@@ -0,0 +1,222 @@
+# utils/facility_index.py
+
+import hashlib
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from utils.profiling import profiled
+
+FACILITY_INDEX_PATH = os.path.join("data", ".cache", "facility_index.pkl")
+EARTH_RADIUS_KM = 6371.0
+FACILITY_COLUMNS = ["name", "building_id", "type", "latitude", "longitude"]
+
+
+# === Parsing ===
+def parse_facilities(city_map):
+    """
+    One row per Point feature of the city map: name, building_id (the
+    number in "Location <id>" names, else missing), type, latitude and
+    longitude. Features without point coordinates are skipped.
+    """
+    rows = [
+        (feature["properties"].get("name"), feature["properties"].get("type", "unknown"),
+         feature["geometry"]["coordinates"][0], feature["geometry"]["coordinates"][1])
+        for feature in city_map["features"]
+        if (feature.get("geometry") or {}).get("type") == "Point"
+    ]
+    facilities = pd.DataFrame(rows, columns=["name", "type", "longitude", "latitude"])
+    ids = facilities["name"].astype("string").str.extract(r"^Location (\d+)$", expand=False)
+    facilities["building_id"] = pd.to_numeric(ids).astype("Int64")
+    facilities["latitude"] = facilities["latitude"].astype(np.float64)
+    facilities["longitude"] = facilities["longitude"].astype(np.float64)
+    return facilities[FACILITY_COLUMNS]
+
+
+def facilities_fingerprint(facilities):
+    """SHA-1 over the facility coordinates, names and types."""
+    digest = hashlib.sha1()
+    digest.update(facilities[["latitude", "longitude"]].to_numpy(dtype=np.float64).tobytes())
+    digest.update("\0".join(facilities["name"].astype(str)).encode())
+    digest.update("\0".join(facilities["type"].astype(str)).encode())
+    return digest.hexdigest()
+
+
+def to_cartesian(lat, lon):
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    return EARTH_RADIUS_KM * np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+# Chord length through the earth <-> great-circle distance along it
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / (2 * EARTH_RADIUS_KM), 0, 1))
+
+
+def km_to_chord(km):
+    return 2 * EARTH_RADIUS_KM * np.sin(min(km / (2 * EARTH_RADIUS_KM), np.pi / 2))
+
+
+# === Index ===
+class FacilityIndex:
+    """
+    KD-trees over the city's facilities, one per facility type plus one over
+    all of them, answering batch k-nearest and radius queries for whole
+    arrays of points at once. Distances are great-circle kilometres.
+    """
+
+    def __init__(self, facilities, trees, fingerprint):
+        self.facilities = facilities
+        self.trees = trees  # type (None for all) -> (cKDTree, facility row positions)
+        self.fingerprint = fingerprint
+
+    @classmethod
+    @profiled(rows_arg=1)
+    def build(cls, facilities, fingerprint=None):
+        facilities = facilities.dropna(subset=["latitude", "longitude"]).reset_index(drop=True)
+        xyz = to_cartesian(facilities["latitude"], facilities["longitude"])
+        trees = {None: (cKDTree(xyz), np.arange(len(facilities)))}
+        for facility_type, rows in facilities.groupby("type", sort=True).indices.items():
+            trees[facility_type] = (cKDTree(xyz[rows]), rows)
+        if fingerprint is None:
+            fingerprint = facilities_fingerprint(facilities)
+        return cls(facilities, trees, fingerprint)
+
+    @property
+    def types(self):
+        return [facility_type for facility_type in self.trees if facility_type is not None]
+
+    def _tree(self, facility_type):
+        if facility_type not in self.trees:
+            raise KeyError(f"No facilities of type {facility_type!r}; known types: {self.types}")
+        return self.trees[facility_type]
+
+    def _result(self, query_ids, query_rows, facility_rows, distance_km, rank=None):
+        result = pd.DataFrame({"query_id": np.asarray(query_ids)[query_rows]})
+        if rank is not None:
+            result["rank"] = rank
+        facilities = self.facilities.iloc[facility_rows].reset_index(drop=True)
+        result = pd.concat([result, facilities], axis=1)
+        result["distance_km"] = distance_km
+        return result
+
+    @staticmethod
+    def _queries(lat, lon, ids):
+        xyz = to_cartesian(lat, lon)
+        valid = np.flatnonzero(np.isfinite(xyz).all(axis=1))
+        ids = np.arange(len(xyz)) if ids is None else np.asarray(ids)
+        return xyz, valid, ids
+
+    @profiled(rows_arg=1)
+    def nearest(self, lat, lon, k=1, facility_type=None, max_km=None, ids=None):
+        """
+        The k nearest facilities (of facility_type, or of any type) to every
+        point, as one row per (point, rank) with the facility's columns and
+        distance_km. query_id is the point's position, or its entry in ids.
+        Points with missing coordinates are left out, as are neighbours
+        beyond max_km.
+        """
+        tree, positions = self._tree(facility_type)
+        xyz, valid, ids = self._queries(lat, lon, ids)
+        k = min(k, len(positions))
+        if k == 0 or len(valid) == 0:
+            return self._result(ids, valid[:0], positions[:0], np.empty(0), rank=np.empty(0, dtype=np.int64))
+
+        bound = np.inf if max_km is None else km_to_chord(max_km) * (1 + 1e-12)
+        chord, nearest = tree.query(xyz[valid], k=k, distance_upper_bound=bound)
+        chord, nearest = chord.reshape(len(valid), k), nearest.reshape(len(valid), k)
+        found = np.isfinite(chord)
+        query_rows = np.repeat(valid, k).reshape(len(valid), k)[found]
+        rank = np.broadcast_to(np.arange(1, k + 1), found.shape)[found]
+        return self._result(ids, query_rows, positions[nearest[found]], chord_to_km(chord[found]), rank)
+
+    @profiled(rows_arg=1)
+    def within(self, lat, lon, radius_km, facility_type=None, ids=None):
+        """
+        Every facility (of facility_type, or of any type) within radius_km of
+        every point, one row per (point, facility) ordered by point and
+        then distance.
+        """
+        tree, positions = self._tree(facility_type)
+        xyz, valid, ids = self._queries(lat, lon, ids)
+        if len(valid) == 0:
+            return self._result(ids, valid, positions[:0], np.empty(0))
+
+        neighbours = tree.query_ball_point(xyz[valid], r=km_to_chord(radius_km))
+        lengths = np.fromiter((len(n) for n in neighbours), dtype=np.intp, count=len(valid))
+        query_rows = np.repeat(valid, lengths)
+        tree_rows = np.fromiter((i for n in neighbours for i in n), dtype=np.intp, count=lengths.sum())
+        distance = chord_to_km(np.linalg.norm(xyz[query_rows] - tree.data[tree_rows], axis=1))
+
+        # Exact great-circle cut-off, then order by point and distance
+        keep = distance <= radius_km
+        query_rows, tree_rows, distance = query_rows[keep], tree_rows[keep], distance[keep]
+        order = np.lexsort((distance, query_rows))
+        return self._result(ids, query_rows[order], positions[tree_rows[order]], distance[order])
+
+    def save(self, path=FACILITY_INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path=FACILITY_INDEX_PATH):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+_loaded_index = None
+
+
+@profiled()
+def get_facility_index(city_map, path=FACILITY_INDEX_PATH):
+    """
+    Returns a FacilityIndex for the city map, reusing the in-memory or
+    on-disk index when its fingerprint matches and rebuilding it only when
+    the facilities have changed.
+    """
+    global _loaded_index
+    facilities = parse_facilities(city_map)
+    fingerprint = facilities_fingerprint(facilities)
+
+    if _loaded_index is not None and _loaded_index.fingerprint == fingerprint:
+        return _loaded_index
+
+    index = None
+    if path and os.path.exists(path):
+        try:
+            index = FacilityIndex.load(path)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            index = None
+    if index is None or index.fingerprint != fingerprint:
+        index = FacilityIndex.build(facilities, fingerprint)
+        if path:
+            try:
+                index.save(path)
+            except OSError:
+                pass  # a read-only data folder only costs a rebuild next run
+
+    _loaded_index = index
+    return index
+
+
+# === Event-to-Resource Analysis ===
+@profiled()
+def nearest_facility_distances(disaster_df, index, facility_types=None):
+    """
+    Distance in km from every event to its nearest facility of each type
+    (all types by default), as columns nearest_<type>_km alongside
+    event_id, disaster_type and location.
+    """
+    result = disaster_df[["event_id", "disaster_type", "location"]].reset_index(drop=True)
+    for facility_type in facility_types or index.types:
+        nearest = index.nearest(disaster_df["latitude"], disaster_df["longitude"], k=1, facility_type=facility_type)
+        distance = np.full(len(result), np.nan)
+        distance[nearest["query_id"].to_numpy()] = nearest["distance_km"].to_numpy()
+        result[f"nearest_{facility_type}_km"] = distance
+    return result
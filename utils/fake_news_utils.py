@@ -1,6 +1,11 @@
+import re
+from functools import lru_cache
+
 import pandas as pd
 import numpy as np
 from scipy.spatial import cKDTree
+from utils.parallel import SharedArrays, map_shared, resolve_workers, split_ranges
+from utils.profiling import profiled
 
 # Disaster type keyword matching
 def get_disaster_type_from_text(text):
@@ -18,6 +23,57 @@ def get_disaster_type_from_text(text):
     else:
         return "unknown"
 
+# Keyword table in priority order: the first type with a keyword in the
+# text wins, exactly like the if/elif chain above. Pass your own table to
+# classify_disaster_types to add hazard types.
+DISASTER_KEYWORDS = (
+    ("earthquake", ("earthquake",)),
+    ("fire", ("fire",)),
+    ("flood", ("flood",)),
+    ("hurricane", ("hurricane",)),
+    ("industrial accident", ("industrial", "explosion", "chemical")),
+)
+
+@lru_cache(maxsize=32)
+def _compile_keyword_matcher(keywords):
+    # One alternation of every keyword inside a zero-width lookahead, which
+    # findall tries at every character position. Zero width keeps
+    # overlapping keywords visible, as the `in` checks of
+    # get_disaster_type_from_text see them ("hurricanearthquake" holds
+    # both); a consuming alternation would skip the second. Keywords are
+    # listed in type priority order, so each position reports its
+    # highest-priority keyword; `priority` maps keywords to type ranks.
+    priority = {}
+    for rank, (_, words) in enumerate(keywords):
+        for word in words:
+            priority.setdefault(word.lower(), rank)
+    ordered = sorted(priority, key=lambda word: (priority[word], -len(word)))
+    pattern = re.compile("(?=(%s))" % "|".join(re.escape(word) for word in ordered), re.DOTALL)
+    return pattern, priority
+
+# Vectorized keyword classifier: each distinct text is matched once and the
+# labels are mapped back through category codes.
+@profiled()
+def classify_disaster_types(texts, keywords=DISASTER_KEYWORDS):
+    keywords = tuple((dtype, tuple(words)) for dtype, words in keywords)
+    matcher, priority = _compile_keyword_matcher(keywords)
+    labels = [dtype for dtype, _ in keywords]
+    categories = list(dict.fromkeys(labels + ["unknown"]))
+    unknown = categories.index("unknown")
+    label_codes = [categories.index(label) for label in labels]
+
+    texts = pd.Series(texts)
+    codes, uniques = pd.factorize(texts)
+    unique_codes = np.full(len(uniques) + 1, unknown, dtype=np.int64)  # last slot is for missing text
+    for i, text in enumerate(pd.Series(uniques).astype(str).str.lower()):
+        # Of the keywords found, the one whose type comes first wins
+        found = matcher.findall(text)
+        if found:
+            unique_codes[i] = label_codes[min(priority[word] for word in found)]
+
+    result = pd.Categorical.from_codes(unique_codes[codes], categories=categories)
+    return pd.Series(result, index=texts.index)
+
 # Lat/lon to 3D cartesian conversion for KDTree
 EARTH_RADIUS_KM = 6371.0
 def latlon_to_cartesian(lat, lon):
@@ -28,42 +84,159 @@ def latlon_to_cartesian(lat, lon):
     z = EARTH_RADIUS_KM * np.sin(lat)
     return np.vstack((x, y, z)).T
 
-# Main fake news detection function
-def detect_fake_news(social_media, disaster_events, time_window_hours=3, distance_km=20, debug=False):
-    social_media["detected_disaster_type"] = social_media["text"].apply(get_disaster_type_from_text)
-    social_media["is_verified_event"] = False
+# Hours since the epoch as floats (NaN for missing timestamps)
+def to_epoch_hours(values):
+    values = pd.to_datetime(pd.Series(values))
+    return ((values - pd.Timestamp(0)) / pd.Timedelta(hours=1)).to_numpy(dtype=np.float64)
+
+# Flags every point that has at least one event within distance_km and
+# time_window_hours. Space and scaled time form a 4-D tree. Each point's
+# nearest event in that metric is checked first, which settles most points;
+# only points whose nearest candidate fails the exact limits have all their
+# candidates checked, in batches of at most max_pairs pairs, so dense
+# clusters never materialize every (point, event) pair at once.
+@profiled()
+def match_any_event(sm_xyz, sm_hours, ev_xyz, ev_hours, time_window_hours, distance_km, chunk_size=200_000,
+                    max_pairs=1_000_000):
+    matched = np.zeros(len(sm_xyz), dtype=bool)
+    ev_ok = np.isfinite(ev_xyz).all(axis=1) & np.isfinite(ev_hours)
+    if not ev_ok.any() or len(sm_xyz) == 0:
+        return matched
+
+    # A time gap of time_window_hours maps to distance_km, so both limits
+    # hold only inside a 4-D ball of radius distance_km * sqrt(2) (widened
+    # by a hair so rounding never drops a true match).
+    scale = distance_km / max(time_window_hours, 1e-9)
+    ev_xyz, ev_hours = ev_xyz[ev_ok], ev_hours[ev_ok]
+    ev_tree = cKDTree(np.column_stack((ev_xyz, ev_hours * scale)))
+    radius = distance_km * np.sqrt(2) * (1 + 1e-9)
+
+    def within(rows, events):
+        gap = sm_xyz[rows] - ev_xyz[events]
+        close = np.einsum("ij,ij->i", gap, gap) <= distance_km ** 2
+        return close & (np.abs(sm_hours[rows] - ev_hours[events]) <= time_window_hours)
 
-    for dtype in disaster_events["disaster_type"].unique():
-        sm_subset = social_media[social_media["detected_disaster_type"] == dtype].copy()
-        ev_subset = disaster_events[disaster_events["disaster_type"] == dtype].copy()
+    sm_ok = np.flatnonzero(np.isfinite(sm_xyz).all(axis=1) & np.isfinite(sm_hours))
+    for start in range(0, len(sm_ok), chunk_size):
+        rows = sm_ok[start:start + chunk_size]
+        sm_points = np.column_stack((sm_xyz[rows], sm_hours[rows] * scale))
+        distance, nearest = ev_tree.query(sm_points, k=1, distance_upper_bound=radius)
+        found = np.flatnonzero(np.isfinite(distance))
+        hit = within(rows[found], nearest[found])
+        matched[rows[found[hit]]] = True
 
-        if sm_subset.empty or ev_subset.empty:
+        unsure = found[~hit]
+        if len(unsure) == 0:
             continue
+        lengths = ev_tree.query_ball_point(sm_points[unsure], radius, return_length=True)
+        ends = np.cumsum(lengths)
+        lo = 0
+        while lo < len(unsure):
+            # At least one point per batch, however many candidates it has
+            hi = max(int(np.searchsorted(ends, ends[lo] - lengths[lo] + max_pairs, side="right")), lo + 1)
+            batch = unsure[lo:hi]
+            pairs = cKDTree(sm_points[batch]).sparse_distance_matrix(ev_tree, radius, output_type="ndarray")
+            i, j = rows[batch[pairs["i"]]], pairs["j"]
+            matched[i[within(i, j)]] = True
+            lo = hi
 
-        sm_coords = latlon_to_cartesian(sm_subset["latitude"].values, sm_subset["longitude"].values)
-        ev_coords = latlon_to_cartesian(ev_subset["latitude"].values, ev_subset["longitude"].values)
+    return matched
 
-        tree = cKDTree(ev_coords)
-        distances, indices = tree.query(sm_coords, distance_upper_bound=distance_km)
+# Matches one slice of the type-sorted tweets against its type's events
+# inside a pool worker; the inputs and the output flags live in shared memory.
+def _match_partition(task, arrays):
+    sm_start, sm_stop, ev_start, ev_stop, time_window_hours, distance_km = task
+    matched = match_any_event(arrays["sm_xyz"][sm_start:sm_stop], arrays["sm_hours"][sm_start:sm_stop],
+                              arrays["ev_xyz"][ev_start:ev_stop], arrays["ev_hours"][ev_start:ev_stop],
+                              time_window_hours, distance_km)
+    arrays["matched"][sm_start:sm_stop] = matched
+    return int(matched.sum())
 
-        matched = distances != np.inf
-        matched_indices = np.where(matched)[0]
+# Runs the per-type matches in a process pool. Tweets and events are laid
+# out grouped by type in shared memory, and large types are split into
+# tweet slices so every worker gets a share; each tweet is matched
+# independently, so the flags are the same as the serial loop's.
+def _match_partitions_parallel(partitions, sm_xyz, sm_hours, ev_xyz, ev_hours, time_window_hours,
+                               distance_km, workers):
+    sm_order = np.concatenate([sm_rows for _, sm_rows, _ in partitions])
+    ev_order = np.concatenate([ev_rows for _, _, ev_rows in partitions])
+    slice_size = max(-(-len(sm_order) // (workers * 4)), 1)
 
-        for i in matched_indices:
-            event_idx = indices[i]
-            if event_idx < len(ev_subset):
-                tweet_time = sm_subset.iloc[i]["timestamp"]
-                event_time = ev_subset.iloc[event_idx]["date"]
-                time_diff_hr = abs((tweet_time - event_time).total_seconds()) / 3600
-                if time_diff_hr <= time_window_hours:
-                    social_media.loc[sm_subset.index[i], "is_verified_event"] = True
-                    if debug:
-                        print(f"[✓] Matched: tweet @ {tweet_time} ↔ event @ {event_time} | dist = {distances[i]:.1f} km, time_diff = {time_diff_hr:.1f} hr")
+    tasks, task_types = [], []
+    sm_start = ev_start = 0
+    for dtype, sm_rows, ev_rows in partitions:
+        sm_stop, ev_stop = sm_start + len(sm_rows), ev_start + len(ev_rows)
+        for lo, hi in split_ranges(sm_start, sm_stop, -(-len(sm_rows) // slice_size)):
+            tasks.append((lo, hi, ev_start, ev_stop, time_window_hours, distance_km))
+            task_types.append(dtype)
+        sm_start, ev_start = sm_stop, ev_stop
+
+    with SharedArrays({
+        "sm_xyz": sm_xyz[sm_order], "sm_hours": sm_hours[sm_order],
+        "ev_xyz": ev_xyz[ev_order], "ev_hours": ev_hours[ev_order],
+        "matched": np.zeros(len(sm_order), dtype=bool),
+    }) as shared:
+        counts = map_shared(_match_partition, tasks, shared, workers)
+        matched_rows = sm_order[shared.arrays["matched"]]
+
+    matched_by_type = {}
+    for dtype, count in zip(task_types, counts):
+        matched_by_type[dtype] = matched_by_type.get(dtype, 0) + count
+    return matched_rows, matched_by_type
+
+# Tweets per worker below which detect_fake_news stays serial. Measured
+# pool overhead is ~0.06 s against ~0.7 us per tweet serially, so a worker
+# needs ~200k tweets to save more than it costs.
+PARALLEL_MIN_ROWS = 200_000
+
+# Main fake news detection function. workers > 1 (or 0 for every core;
+# None reads CRISISVERSE_WORKERS) matches the disaster types in a process
+# pool with the same result as the serial loop.
+@profiled()
+def detect_fake_news(social_media, disaster_events, time_window_hours=3, distance_km=20, debug=False,
+                     keywords=DISASTER_KEYWORDS, workers=None):
+    social_media["detected_disaster_type"] = classify_disaster_types(social_media["text"], keywords)
+    verified = np.zeros(len(social_media), dtype=bool)
+
+    sm_types = social_media["detected_disaster_type"].to_numpy()
+    ev_types = disaster_events["disaster_type"].to_numpy()
+    sm_xyz = latlon_to_cartesian(social_media["latitude"].to_numpy(dtype=np.float64),
+                                 social_media["longitude"].to_numpy(dtype=np.float64))
+    ev_xyz = latlon_to_cartesian(disaster_events["latitude"].to_numpy(dtype=np.float64),
+                                 disaster_events["longitude"].to_numpy(dtype=np.float64))
+    sm_hours = to_epoch_hours(social_media["timestamp"])
+    ev_hours = to_epoch_hours(disaster_events["date"])
+
+    partitions = []
+    for dtype in pd.unique(ev_types):
+        sm_rows = np.flatnonzero(sm_types == dtype)
+        ev_rows = np.flatnonzero(ev_types == dtype)
+        if len(sm_rows) and len(ev_rows):
+            partitions.append((dtype, sm_rows, ev_rows))
+
+    workers = resolve_workers(workers, sum(len(sm_rows) for _, sm_rows, _ in partitions),
+                              min_rows=PARALLEL_MIN_ROWS)
+    if workers > 1 and partitions:
+        matched_rows, matched_by_type = _match_partitions_parallel(
+            partitions, sm_xyz, sm_hours, ev_xyz, ev_hours, time_window_hours, distance_km, workers)
+        verified[matched_rows] = True
+        if debug:
+            for dtype, sm_rows, ev_rows in partitions:
+                print(f"[✓] {dtype}: {matched_by_type[dtype]} of {len(sm_rows)} tweets matched {len(ev_rows)} events")
+    else:
+        for dtype, sm_rows, ev_rows in partitions:
+            matched = match_any_event(sm_xyz[sm_rows], sm_hours[sm_rows], ev_xyz[ev_rows], ev_hours[ev_rows],
+                                      time_window_hours, distance_km)
+            verified[sm_rows[matched]] = True
+            if debug:
+                print(f"[✓] {dtype}: {matched.sum()} of {len(sm_rows)} tweets matched {len(ev_rows)} events")
 
-    social_media["is_potential_fake"] = ~social_media["is_verified_event"]
+    social_media["is_verified_event"] = verified
+    social_media["is_potential_fake"] = ~verified
     return social_media
 
 # Convert sensor data to disaster_events-like format
+@profiled()
 def extract_sensor_disasters(sensor_df):
     active = sensor_df[sensor_df["status"] == "active"]
     mapping = {
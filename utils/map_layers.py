@@ -0,0 +1,124 @@
+# utils/map_layers.py
+
+import folium
+import numpy as np
+import pandas as pd
+
+from utils.profiling import profiled
+
+# Severity color palette (1-3 low, 4-6 medium, 7-9 high)
+SEVERITY_BINS = [(3, "green"), (6, "orange"), (9, "red")]
+# Above this many events the map switches from single points to grid cells
+POINT_LIMIT = 2000
+
+
+def severity_colors(severity):
+    """Vectorized severity -> color, "gray" outside 1-9."""
+    severity = np.asarray(severity, dtype=np.float64)
+    colors = np.full(len(severity), "gray", dtype=object)
+    lower = 1
+    for upper, color in SEVERITY_BINS:
+        colors[(severity >= lower) & (severity <= upper)] = color
+        lower = upper + 1
+    return colors
+
+
+def events_to_geojson(df):
+    """One GeoJSON FeatureCollection for all events, built from column arrays."""
+    lat = df["latitude"].to_numpy(dtype=np.float64)
+    lon = df["longitude"].to_numpy(dtype=np.float64)
+    severity = df["severity"].to_numpy()
+    colors = severity_colors(severity)
+    dates = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d").fillna("").to_numpy()
+    types = df["disaster_type"].astype(str).to_numpy()
+    zones = df["location"].astype(str).to_numpy()
+
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [float(x), float(y)]},
+            "properties": {
+                "disaster_type": t, "zone": z, "date": d,
+                "severity": int(s), "color": c
+            },
+        }
+        for x, y, t, z, d, s, c in zip(lon, lat, types, zones, dates, severity, colors)
+    ]
+    return {"type": "FeatureCollection", "features": features}
+
+
+def events_to_grid_geojson(df, cell_deg=0.02):
+    """
+    Aggregates events into cell_deg x cell_deg cells and returns one
+    rectangle feature per non-empty cell with its event count and max
+    severity (which also picks the color).
+    """
+    cells = pd.DataFrame({
+        "row": np.floor(df["latitude"].to_numpy(dtype=np.float64) / cell_deg).astype(np.int64),
+        "col": np.floor(df["longitude"].to_numpy(dtype=np.float64) / cell_deg).astype(np.int64),
+        "severity": df["severity"].to_numpy(),
+    })
+    grid = cells.groupby(["row", "col"]).agg(
+        events=("severity", "size"),
+        max_severity=("severity", "max")
+    ).reset_index()
+    colors = severity_colors(grid["max_severity"])
+
+    features = []
+    for r, c, n, s, color in zip(grid["row"], grid["col"], grid["events"], grid["max_severity"], colors):
+        south, west = r * cell_deg, c * cell_deg
+        north, east = south + cell_deg, west + cell_deg
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Polygon", "coordinates": [[
+                [west, south], [east, south], [east, north], [west, north], [west, south]
+            ]]},
+            "properties": {"events": int(n), "max_severity": int(s), "color": color},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+@profiled()
+def build_event_layer(df, mode="Auto", point_limit=POINT_LIMIT, cell_deg=0.02):
+    """
+    Returns a plain-dict description of the map layer (cacheable and cheap
+    to hand to folium): points with popups for small selections, severity
+    grid cells for large ones or when mode is "Grid".
+    """
+    if mode == "Points" or (mode == "Auto" and len(df) <= point_limit):
+        kind, geojson = "points", events_to_geojson(df)
+    else:
+        kind, geojson = "grid", events_to_grid_geojson(df, cell_deg)
+    return {
+        "kind": kind,
+        "geojson": geojson,
+        "center": [float(df["latitude"].mean()), float(df["longitude"].mean())],
+        "events": len(df),
+    }
+
+
+def add_event_layer(m, layer):
+    """Adds a layer from build_event_layer to a folium map as one GeoJson."""
+    if layer["kind"] == "points":
+        folium.GeoJson(
+            layer["geojson"],
+            name="Disaster Events",
+            marker=folium.CircleMarker(radius=6, fill=True, fill_opacity=0.8),
+            style_function=lambda f: {"color": f["properties"]["color"], "fillColor": f["properties"]["color"]},
+            popup=folium.GeoJsonPopup(
+                fields=["disaster_type", "zone", "date", "severity"],
+                aliases=["Type", "Zone", "Date", "Severity"],
+                max_width=250
+            ),
+        ).add_to(m)
+    else:
+        folium.GeoJson(
+            layer["geojson"],
+            name="Disaster Density",
+            style_function=lambda f: {
+                "color": f["properties"]["color"], "fillColor": f["properties"]["color"],
+                "weight": 0.5, "fillOpacity": 0.5
+            },
+            tooltip=folium.GeoJsonTooltip(fields=["events", "max_severity"], aliases=["Events", "Max Severity"]),
+        ).add_to(m)
+    return m
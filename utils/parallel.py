@@ -0,0 +1,114 @@
+# utils/parallel.py
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Worker processes used when a function is called with workers=None:
+# 1 keeps everything serial, 0 means one per core.
+DEFAULT_WORKERS = int(os.environ.get("CRISISVERSE_WORKERS", "1"))
+
+# Inputs smaller than this per worker are not worth a process pool. Callers
+# pass their own measured figure: a worker must save more serial time than
+# the pool costs (start-up, shared-memory copies, pickled results).
+MIN_ROWS_PER_WORKER = 200_000
+
+
+def resolve_workers(workers=None, n_rows=None, min_rows=MIN_ROWS_PER_WORKER):
+    """
+    Number of processes to use for n_rows of work (1 means run serially).
+    Never more than the machine's cores, so a single-core host always runs
+    serially.
+    """
+    if workers is None:
+        workers = DEFAULT_WORKERS
+    cores = os.cpu_count() or 1
+    if workers <= 0:
+        workers = cores
+    workers = min(workers, cores)
+    if n_rows is not None:
+        workers = min(workers, max(n_rows // max(min_rows, 1), 1))
+    return max(workers, 1)
+
+
+def split_ranges(start, stop, parts):
+    """Splits [start, stop) into at most `parts` contiguous, near-equal (start, stop) ranges."""
+    size = max(math.ceil((stop - start) / max(parts, 1)), 1)
+    return [(lo, min(lo + size, stop)) for lo in range(start, stop, size)]
+
+
+# === Shared Memory ===
+class SharedArrays:
+    """
+    Copies numpy arrays into named shared-memory blocks so pool workers can
+    map them instead of receiving pickled copies. Use as a context manager;
+    `arrays` holds the parent's views (workers may write into them, e.g. to
+    fill an output buffer) and the blocks are freed on exit.
+    """
+
+    def __init__(self, arrays):
+        self._blocks = []
+        self.specs = {}
+        self.arrays = {}
+        try:
+            for key, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                if array.dtype.hasobject:
+                    raise TypeError(f"{key}: object arrays cannot be shared")
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                self._blocks.append(block)
+                view = np.ndarray(array.shape, array.dtype, buffer=block.buf)
+                view[...] = array
+                self.specs[key] = (block.name, array.shape, array.dtype.str)
+                self.arrays[key] = view
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        self.arrays = {}
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+
+# Blocks and views mapped by this worker process (set by the pool initializer)
+_worker_blocks = []
+_worker_arrays = {}
+
+
+def _attach(specs):
+    for key, (name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        _worker_blocks.append(block)
+        _worker_arrays[key] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+
+
+def _call(func, task):
+    return func(task, _worker_arrays)
+
+
+def map_shared(func, tasks, shared, workers):
+    """
+    Runs func(task, arrays) for every task in a pool of `workers` processes,
+    where `arrays` maps the keys of `shared` to views of its blocks. func
+    must be a module-level function. Results come back in task order.
+    """
+    tasks = list(tasks)
+    if workers <= 1 or len(tasks) <= 1:
+        return [func(task, shared.arrays) for task in tasks]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_attach,
+                             initargs=(shared.specs,)) as pool:
+        return list(pool.map(partial(_call, func), tasks))
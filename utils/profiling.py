@@ -0,0 +1,250 @@
+# utils/profiling.py
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# Off unless CRISISVERSE_PROFILE=1 or enable() is called. While off, stage()
+# returns a shared no-op context and @profiled calls straight through.
+_enabled = os.environ.get("CRISISVERSE_PROFILE", "0") == "1"
+_records = deque(maxlen=10_000)
+_records_lock = threading.Lock()
+_local = threading.local()
+
+PROFILE_JSONL_PATH = os.path.join("data", ".cache", "profile.jsonl")
+PROFILE_PROM_PATH = os.path.join("data", ".cache", "profile.prom")
+
+
+def enable(trace_memory=True):
+    """Turns recording on; trace_memory also starts tracemalloc for peak-memory deltas."""
+    global _enabled
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def is_enabled():
+    return _enabled
+
+
+if _enabled:
+    enable()
+
+
+def count_rows(obj):
+    """Row count of a frame, series, array or list (first element of a tuple), else None."""
+    if isinstance(obj, tuple):
+        return count_rows(obj[0]) if obj else None
+    if isinstance(obj, (pd.DataFrame, pd.Series, np.ndarray, list)):
+        return len(obj)
+    return None
+
+
+# === Stages ===
+class _NullStage:
+    """Stand-in returned while profiling is off; ignores everything."""
+
+    rows = rows_in = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """One timed region. Set `rows` inside the block to record a row count."""
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.rows_in = None
+        self._peak_seen = 0
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.path = "/".join([s.name for s in stack] + [self.name])
+        self._tracing = tracemalloc.is_tracing()
+        if self._tracing:
+            # The tracemalloc peak is global: hand the peak so far to the
+            # enclosing stage before resetting it for this one.
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]._peak_seen = max(stack[-1]._peak_seen, peak)
+            tracemalloc.reset_peak()
+            self._mem_start = current
+        stack.append(self)
+        self._started_at = time.time()
+        self._cpu_start = time.thread_time()
+        self._wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall_start
+        cpu = time.thread_time() - self._cpu_start
+        stack = _local.stack
+        stack.pop()
+
+        peak_delta = None
+        if self._tracing and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, self._peak_seen)
+            peak_delta = max(peak - self._mem_start, 0)
+            if stack:
+                stack[-1]._peak_seen = max(stack[-1]._peak_seen, peak)
+
+        record = {
+            "stage": self.name,
+            "path": self.path,
+            "started_at": round(self._started_at, 3),
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "peak_mem_mb": None if peak_delta is None else round(peak_delta / 2**20, 3),
+            "rows_in": self.rows_in,
+            "rows": self.rows,
+            "thread": threading.current_thread().name,
+            "error": None if exc_type is None else exc_type.__name__,
+        }
+        with _records_lock:
+            _records.append(record)
+        return False
+
+
+def stage(name, rows=None):
+    """
+    Context manager timing a block as `name`: wall time, CPU time of the
+    calling thread, peak traced memory above the level at entry, and an
+    optional row count. Nested stages record their path ("tab/loader").
+    """
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name, rows)
+
+
+def profiled(name=None, rows_arg=0):
+    """
+    Decorator recording every call as a stage named `name` (default
+    module.qualname). Rows in/out are taken from the positional argument at
+    `rows_arg` (1 on methods, to skip self/cls; None for no count) and the
+    result when they are frames, series, arrays or lists.
+    """
+    def decorator(func):
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(label) as s:
+                if rows_arg is not None and len(args) > rows_arg:
+                    s.rows_in = count_rows(args[rows_arg])
+                result = func(*args, **kwargs)
+                s.rows = count_rows(result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+# === Reading and Exporting ===
+def records(since=None):
+    """Recorded stages as a DataFrame, optionally only those started at/after `since` (unix time)."""
+    with _records_lock:
+        rows = list(_records)
+    df = pd.DataFrame(rows, columns=["stage", "path", "started_at", "wall_s", "cpu_s", "peak_mem_mb",
+                                     "rows_in", "rows", "thread", "error"])
+    if since is not None:
+        df = df[df["started_at"] >= since]
+    return df
+
+
+def summary(since=None):
+    """Per-stage call count, total/mean/p95 wall time, CPU time, max peak memory and rows."""
+    df = records(since)
+    if df.empty:
+        return pd.DataFrame()
+    grouped = df.groupby("stage")
+    out = pd.DataFrame({
+        "calls": grouped.size(),
+        "wall_s": grouped["wall_s"].sum(),
+        "mean_ms": grouped["wall_s"].mean() * 1000,
+        "p95_ms": grouped["wall_s"].quantile(0.95) * 1000,
+        "cpu_s": grouped["cpu_s"].sum(),
+        "peak_mem_mb": grouped["peak_mem_mb"].max(),
+        "rows": grouped["rows"].sum(min_count=1),
+    })
+    return out.sort_values("wall_s", ascending=False).round(3)
+
+
+def clear():
+    with _records_lock:
+        _records.clear()
+
+
+def to_jsonl(since=None):
+    with _records_lock:
+        rows = list(_records)
+    return "".join(json.dumps(row) + "\n" for row in rows if since is None or row["started_at"] >= since)
+
+
+def to_prometheus(since=None):
+    """Prometheus text exposition of the per-stage totals."""
+    df = summary(since)
+    metrics = [
+        ("crisisverse_stage_calls_total", "counter", "Calls per stage", "calls", 1),
+        ("crisisverse_stage_wall_seconds_total", "counter", "Wall-clock seconds per stage", "wall_s", 1),
+        ("crisisverse_stage_cpu_seconds_total", "counter", "Thread CPU seconds per stage", "cpu_s", 1),
+        ("crisisverse_stage_peak_memory_bytes", "gauge", "Largest peak traced memory delta", "peak_mem_mb", 2**20),
+        ("crisisverse_stage_rows_total", "counter", "Rows returned per stage", "rows", 1),
+    ]
+    lines = []
+    for metric, kind, help_text, column, scale in metrics:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for stage_name, value in df.get(column, pd.Series(dtype=float)).items():
+            if pd.notna(value):
+                label = str(stage_name).replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'{metric}{{stage="{label}"}} {value * scale:g}')
+    return "\n".join(lines) + "\n"
+
+
+def export_jsonl(path=PROFILE_JSONL_PATH, since=None):
+    """Appends the recorded stages to a JSON-lines file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        f.write(to_jsonl(since))
+    return path
+
+
+def export_prometheus(path=PROFILE_PROM_PATH, since=None):
+    """Writes the per-stage totals as a Prometheus textfile-collector file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(to_prometheus(since))
+    os.replace(tmp_path, path)
+    return path
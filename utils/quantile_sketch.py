@@ -0,0 +1,91 @@
+# utils/quantile_sketch.py
+
+import numpy as np
+
+
+class KLLSketch:
+    """
+    Approximate quantiles of a stream in bounded memory (a KLL sketch).
+
+    Values land in level 0. A level over its capacity is sorted and every
+    other item (from a random offset) moves up a level, where it stands for
+    twice as many values. Capacities shrink by 2/3 per level below the top
+    one, so a sketch keeps O(k) items whatever the stream length. Rank
+    error is roughly 1/k of n. Sketches built on separate chunks merge into
+    the sketch of their union. Until the first compaction the retained
+    values are the whole stream, and quantiles are exact (numpy's linear
+    interpolation, as pandas uses).
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                paired = len(items) - len(items) % 2
+                promoted = items[self._rng.integers(2):paired:2]
+                self.levels[level] = items[paired:]
+                self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+            level += 1
+
+    def update(self, values):
+        """Adds an array of values (NaN is ignored)."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+            self.levels[0] = np.concatenate((self.levels[0], values))
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """Folds another sketch into this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    @property
+    def size(self):
+        """Values currently retained."""
+        return sum(len(items) for items in self.levels)
+
+    def quantile(self, q):
+        """Approximate q-quantile(s) of everything added so far (NaN when empty)."""
+        q = np.asarray(q, dtype=np.float64)
+        if self.n == 0:
+            return np.full(q.shape, np.nan) if q.ndim else np.nan
+        if len(self.levels) == 1:
+            return np.quantile(self.levels[0], q)
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        idx = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+        result = items[np.clip(idx, 0, len(items) - 1)]
+        # The extremes are tracked exactly
+        result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+        return result if q.ndim else float(result)
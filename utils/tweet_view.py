@@ -0,0 +1,79 @@
+# utils/tweet_view.py
+
+import numpy as np
+import pandas as pd
+
+from utils.profiling import profiled
+
+DISPLAY_COLUMNS = ["timestamp", "text", "latitude", "longitude", "detected_disaster_type", "is_verified_event"]
+STATUS_OPTIONS = ["All", "Verified", "Potential Fake"]
+
+
+class TweetQueryView:
+    """
+    Server-side query view over classified tweets (the detect_fake_news
+    output). The time order and the status / disaster-type masks are built
+    once; each query narrows the time range with searchsorted, applies the
+    masks to that slice and returns a single page of rows.
+    """
+
+    def __init__(self, result_df, columns=DISPLAY_COLUMNS):
+        df = result_df.reset_index(drop=True)
+        self.frame = df[columns]
+
+        timestamps = pd.to_datetime(df["timestamp"])
+        # NaT sorts first in datetime64 order; push it past every real time
+        ts = timestamps.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        ts = np.where(timestamps.isna().to_numpy(), np.iinfo(np.int64).max, ts)
+        self._missing_time = timestamps.isna().to_numpy()
+        self._order = np.argsort(ts, kind="stable")
+        self._sorted_ts = ts[self._order]
+
+        self._status_masks = {
+            "All": None,
+            "Verified": df["is_verified_event"].to_numpy(dtype=bool),
+            "Potential Fake": df["is_potential_fake"].to_numpy(dtype=bool),
+        }
+        self._type_codes, types = pd.factorize(df["detected_disaster_type"].astype(str))
+        self.disaster_types = list(types)
+        self.time_range = (timestamps.min(), timestamps.max())
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __sizeof__(self):
+        # The frame plus the precomputed order and masks (see cache_utils.estimate_size)
+        arrays = [self._missing_time, self._order, self._sorted_ts, self._type_codes]
+        arrays += [mask for mask in self._status_masks.values() if mask is not None]
+        return (object.__sizeof__(self) + int(self.frame.memory_usage(index=True, deep=True).sum())
+                + sum(array.nbytes for array in arrays))
+
+    @profiled(rows_arg=None)
+    def query(self, status="All", disaster_types=None, start=None, end=None,
+              ascending=False, page=1, page_size=200):
+        """
+        Returns (page_df, total_matches) for the filters. `start`/`end` are
+        inclusive timestamps, `page` is 1-based.
+        """
+        lo, hi = 0, len(self._order)
+        if start is not None:
+            lo = np.searchsorted(self._sorted_ts, pd.Timestamp(start).as_unit("ns").value, side="left")
+        if end is not None:
+            hi = np.searchsorted(self._sorted_ts, pd.Timestamp(end).as_unit("ns").value, side="right")
+        rows = self._order[lo:hi]
+
+        status_mask = self._status_masks[status]
+        if status_mask is not None:
+            rows = rows[status_mask[rows]]
+        if disaster_types is not None and len(disaster_types) < len(self.disaster_types):
+            wanted = np.isin(np.arange(len(self.disaster_types)),
+                             [self.disaster_types.index(t) for t in disaster_types if t in self.disaster_types])
+            rows = rows[wanted[self._type_codes[rows]]]
+
+        total = len(rows)
+        if not ascending:
+            # Newest first, with missing timestamps still at the end
+            missing = self._missing_time[rows]
+            rows = np.concatenate((rows[~missing][::-1], rows[missing]))
+        first = max(page - 1, 0) * page_size
+        return self.frame.iloc[rows[first:first + page_size]], total
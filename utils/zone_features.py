@@ -2,18 +2,31 @@
 
 import pandas as pd
 
-import pandas as pd
+from utils.zone_store import ZoneAggregateStore
+from utils.profiling import profiled
+
 
-def generate_zone_sensor_features(sensor_df):
-    if 'timestamp' in sensor_df.columns:
-        sensor_df['timestamp'] = pd.to_datetime(sensor_df['timestamp'])
+@profiled()
+def generate_zone_sensor_features(sensor_df=None, store=None):
+    """
+    Per-zone reading stats and anomaly counts, answered from a
+    ZoneAggregateStore. Pass a long-lived `store` to keep the aggregates
+    across calls; `sensor_df`, if given, is appended to it first, so only
+    pass rows the store has not seen yet.
+    """
+    if store is None:
+        store = ZoneAggregateStore()
+    if sensor_df is not None:
+        store.append_sensors(sensor_df, zone_col="zone_id")
 
-    zone_stats = sensor_df.groupby("zone_id").agg(
-        mean_value=("reading_value", "mean"),
-        max_value=("reading_value", "max"),
-        min_value=("reading_value", "min"),
-        anomaly_count=("anomaly_flag", "sum"),
-        sensor_count=("sensor_type", "count")
-    ).reset_index()
+    zones = store.zone_stats()
+    zone_stats = pd.DataFrame({
+        "zone_id": zones.index,
+        "mean_value": zones["mean"].to_numpy(),
+        "max_value": zones["max"].to_numpy(),
+        "min_value": zones["min"].to_numpy(),
+        "anomaly_count": zones["anomalies"].to_numpy(),
+        "sensor_count": zones["sensor_rows"].to_numpy(),
+    })
 
     return zone_stats
@@ -1,23 +1,124 @@
 # utils/zone_mapper.py
 
-from scipy.spatial import cKDTree
+import hashlib
+import os
+import pickle
+
 import numpy as np
 import pandas as pd
+from scipy.spatial import cKDTree
 
-# utils/zone_mapper.py
+from utils.profiling import profiled
+
+ZONE_INDEX_PATH = os.path.join("data", ".cache", "zone_index.pkl")
 
-from sklearn.neighbors import KNeighborsClassifier
 
-def assign_zones_to_sensors_knn(sensor_df, disaster_df):
-    # Use labeled disaster zones for training
+def zone_training_data(disaster_df):
+    """Labelled disaster locations used to place sensors in zones."""
     zone_train = disaster_df[['latitude', 'longitude', 'location']].dropna()
-    zone_train = zone_train[zone_train['location'].str.contains('Zone')]
+    return zone_train[zone_train['location'].astype(str).str.contains('Zone')]
 
-    # Train KNN on known zone coordinates
-    knn = KNeighborsClassifier(n_neighbors=1)
-    knn.fit(zone_train[['latitude', 'longitude']], zone_train['location'])
 
-    # Predict zone for each sensor
-    sensor_df['zone_id'] = knn.predict(sensor_df[['latitude', 'longitude']])
-    return sensor_df
+def training_fingerprint(zone_train):
+    """SHA-1 over the training coordinates and labels."""
+    digest = hashlib.sha1()
+    digest.update(zone_train[['latitude', 'longitude']].to_numpy(dtype=np.float64).tobytes())
+    digest.update("\0".join(zone_train['location'].astype(str)).encode())
+    return digest.hexdigest()
+
+
+def to_unit_sphere(lat, lon):
+    # Chord length on the unit sphere grows monotonically with great-circle
+    # distance, so nearest neighbours here are the haversine nearest
+    # neighbours, found with a fast KD-tree instead of a haversine BallTree.
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+class ZoneIndex:
+    """
+    1-nearest-neighbour zone lookup over labelled disaster locations by
+    great-circle distance rather than raw lat/lon Euclidean.
+    """
+
+    def __init__(self, tree, labels, fingerprint):
+        self.tree = tree
+        self.labels = labels
+        self.fingerprint = fingerprint
+
+    @classmethod
+    @profiled(rows_arg=1)
+    def build(cls, zone_train, fingerprint=None):
+        coords = to_unit_sphere(zone_train['latitude'], zone_train['longitude'])
+        labels = zone_train['location'].astype(str).to_numpy(dtype=object)
+        if fingerprint is None:
+            fingerprint = training_fingerprint(zone_train)
+        return cls(cKDTree(coords), labels, fingerprint)
 
+    @profiled(rows_arg=1)
+    def predict(self, lat, lon, batch_size=200_000):
+        """Returns the nearest zone label per point (None where lat/lon is missing)."""
+        coords = to_unit_sphere(lat, lon)
+        zones = np.full(len(coords), None, dtype=object)
+        valid = np.flatnonzero(~np.isnan(coords).any(axis=1))
+        for start in range(0, len(valid), batch_size):
+            rows = valid[start:start + batch_size]
+            _, nearest = self.tree.query(coords[rows], k=1)
+            zones[rows] = self.labels[nearest]
+        return zones
+
+    def save(self, path=ZONE_INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path=ZONE_INDEX_PATH):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+_loaded_index = None
+
+
+@profiled()
+def get_zone_index(disaster_df, path=ZONE_INDEX_PATH):
+    """
+    Returns a ZoneIndex for disaster_df, reusing the in-memory or on-disk
+    index when its fingerprint matches and rebuilding it only when the
+    labelled disaster data has changed.
+    """
+    global _loaded_index
+    zone_train = zone_training_data(disaster_df)
+    fingerprint = training_fingerprint(zone_train)
+
+    if _loaded_index is not None and _loaded_index.fingerprint == fingerprint:
+        return _loaded_index
+
+    index = None
+    if path and os.path.exists(path):
+        try:
+            index = ZoneIndex.load(path)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            index = None
+    if index is None or index.fingerprint != fingerprint:
+        index = ZoneIndex.build(zone_train, fingerprint)
+        if path:
+            try:
+                index.save(path)
+            except OSError:
+                pass  # a read-only data folder only costs a rebuild next run
+
+    _loaded_index = index
+    return index
+
+
+@profiled()
+def assign_zones_to_sensors_knn(sensor_df, disaster_df, index_path=ZONE_INDEX_PATH):
+    # Nearest labelled disaster zone, from the persisted zone index
+    index = get_zone_index(disaster_df, index_path)
+    sensor_df['zone_id'] = index.predict(sensor_df['latitude'], sensor_df['longitude'])
+    return sensor_df
@@ -0,0 +1,164 @@
+# utils/zone_polygons.py
+
+import hashlib
+import os
+from collections import OrderedDict
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from utils.profiling import profiled
+
+# Columns tried, in order, for the zone label when none is given; "Zone"
+# comes first as in the original assign_zones_geospatial
+ZONE_LABEL_COLUMNS = ("Zone", "name", "id")
+ZONES_CRS = "EPSG:4326"
+
+
+def zone_label_column(zones_gdf, label_column=None):
+    """The column naming each zone: label_column, else the first of ZONE_LABEL_COLUMNS present, else None (use the index)."""
+    if label_column is not None:
+        return label_column
+    return next((column for column in ZONE_LABEL_COLUMNS if column in zones_gdf.columns), None)
+
+
+def zones_fingerprint(zones_gdf, label_column=None):
+    """SHA-1 over the zone geometries (WKB), labels and CRS."""
+    column = zone_label_column(zones_gdf, label_column)
+    labels = zones_gdf.index if column is None else zones_gdf[column]
+    digest = hashlib.sha1()
+    digest.update(b"".join(shapely.to_wkb(zones_gdf.geometry.to_numpy()).tolist()))
+    digest.update("\0".join(map(str, labels)).encode())
+    digest.update(str(zones_gdf.crs).encode())
+    return digest.hexdigest()
+
+
+class ZonePolygonIndex:
+    """
+    Zone polygons prepared once for point-in-polygon joins, with an STRtree
+    over them. A point gets the label of the first zone (in map order) it
+    lies strictly within, like sjoin(predicate="within"), and NaN when it
+    is in none.
+    """
+
+    def __init__(self, geometries, labels, fingerprint):
+        self.geometries = geometries
+        self.labels = labels
+        self.fingerprint = fingerprint
+        self.bounds = shapely.bounds(geometries)
+        shapely.prepare(geometries)
+        self.tree = shapely.STRtree(geometries)
+
+    @classmethod
+    @profiled(rows_arg=1)
+    def from_gdf(cls, zones_gdf, label_column=None, fingerprint=None):
+        if fingerprint is None:
+            fingerprint = zones_fingerprint(zones_gdf, label_column)
+        column = zone_label_column(zones_gdf, label_column)
+        if zones_gdf.crs is not None and not zones_gdf.crs.equals(ZONES_CRS):
+            zones_gdf = zones_gdf.to_crs(ZONES_CRS)  # points are plain lat/lon
+        labels = (zones_gdf.index if column is None else zones_gdf[column]).to_numpy(dtype=object)
+        geometries = zones_gdf.geometry.to_numpy().copy()
+        missing = shapely.is_missing(geometries) | shapely.is_empty(geometries)
+        return cls(geometries[~missing], labels[~missing], fingerprint)
+
+    def _labels(self, codes):
+        return np.append(self.labels, np.nan)[codes]  # -1 (no zone) picks the trailing NaN
+
+    @profiled(rows_arg=1)
+    def assign_xy(self, lat, lon, chunk_size=1_000_000):
+        """
+        Zone label per (lat, lon) pair without building Point objects: per
+        chunk, the zones whose box meets the chunk's extent (from the
+        STRtree) test only the points inside their own box, found by
+        binary search on the chunk sorted by longitude.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        codes = np.full(len(lat), -1, dtype=np.intp)
+        valid = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+
+        for start in range(0, len(valid), chunk_size):
+            rows = valid[start:start + chunk_size]
+            x, y = lon[rows], lat[rows]
+            order = np.argsort(x, kind="stable")
+            x_sorted = x[order]
+            chunk_codes = np.full(len(rows), -1, dtype=np.intp)
+
+            extent = shapely.box(x.min(), y.min(), x.max(), y.max())
+            for zone in np.sort(self.tree.query(extent)):
+                x_min, y_min, x_max, y_max = self.bounds[zone]
+                lo = np.searchsorted(x_sorted, x_min, side="left")
+                hi = np.searchsorted(x_sorted, x_max, side="right")
+                candidates = order[lo:hi]
+                candidates = candidates[(y[candidates] >= y_min) & (y[candidates] <= y_max)
+                                        & (chunk_codes[candidates] < 0)]
+                inside = shapely.contains_xy(self.geometries[zone], x[candidates], y[candidates])
+                chunk_codes[candidates[inside]] = zone
+            codes[rows] = chunk_codes
+
+        return self._labels(codes)
+
+    @profiled(rows_arg=1)
+    def assign_points(self, points, chunk_size=500_000):
+        """Zone label per point geometry (in this index's CRS), queried through the STRtree in chunks."""
+        points = np.asarray(points, dtype=object)
+        codes = np.full(len(points), len(self.labels), dtype=np.intp)
+        for start in range(0, len(points), chunk_size):
+            point_idx, zone_idx = self.tree.query(points[start:start + chunk_size], predicate="within")
+            np.minimum.at(codes, point_idx + start, zone_idx)  # first zone in map order
+        codes[codes == len(self.labels)] = -1
+        return self._labels(codes)
+
+
+# Prepared indexes by map version, most recently used last
+_indexes = OrderedDict()
+MAX_CACHED_INDEXES = 4
+
+
+def get_zone_polygon_index(zones_gdf, label_column=None):
+    """Returns the prepared ZonePolygonIndex for this version of the zone map, building it only once."""
+    fingerprint = zones_fingerprint(zones_gdf, label_column)
+    index = _indexes.get(fingerprint)
+    if index is None:
+        index = ZonePolygonIndex.from_gdf(zones_gdf, label_column, fingerprint)
+        _indexes[fingerprint] = index
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    _indexes.move_to_end(fingerprint)
+    return index
+
+
+_files = {}
+
+
+def load_zone_polygon_index(path, label_column=None):
+    """Reads a zone map file (GeoJSON, shapefile, ...) once per (size, mtime) and returns its index."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, label_column)
+    if key not in _files:
+        _files.clear()
+        _files[key] = get_zone_polygon_index(gpd.read_file(path), label_column)
+    return _files[key]
+
+
+@profiled()
+def assign_zones(df, zones, label_column=None):
+    """
+    Copy of df (rows with lat/lon) with a "zone" column from the zone
+    polygons. `zones` is a GeoDataFrame or a ZonePolygonIndex. Rows without
+    coordinates are dropped and points in no zone get NaN. A GeoDataFrame
+    df is joined on its point geometries; anything else takes the fast path
+    on its latitude and longitude columns.
+    """
+    index = zones if isinstance(zones, ZonePolygonIndex) else get_zone_polygon_index(zones, label_column)
+
+    if isinstance(df, gpd.GeoDataFrame) and df.active_geometry_name in df.columns:
+        df = df[~(df.geometry.isna() | df.geometry.is_empty)].copy()
+        geometry = df.geometry if df.crs is None or df.crs.equals(ZONES_CRS) else df.geometry.to_crs(ZONES_CRS)
+        df["zone"] = index.assign_points(geometry.to_numpy())
+    else:
+        df = df.dropna(subset=["latitude", "longitude"]).copy()
+        df["zone"] = index.assign_xy(df["latitude"].to_numpy(), df["longitude"].to_numpy())
+    return df
@@ -0,0 +1,254 @@
+# utils/zone_store.py
+
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+
+ZONE_STORE_PATH = os.path.join("data", ".cache", "zone_store.pkl")
+
+CELL_KEYS = ["zone", "hour", "sensor_type"]
+# How partial cells combine; every column is mergeable, so appending a batch
+# only touches the cells it contains (see _CellTable)
+CELL_AGG = {
+    "rows": "sum",
+    "count": "sum",
+    "sum": "sum",
+    "sumsq": "sum",
+    "min": "min",
+    "max": "max",
+    "anomalies": "sum",
+}
+
+
+def _hours(df):
+    if "timestamp" not in df.columns:
+        return pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    return pd.to_datetime(df["timestamp"], errors="coerce").dt.floor("h")
+
+
+def sensor_cells(sensor_df, zone_col="zone"):
+    """Partial zone x hour x sensor_type aggregates of one batch of readings."""
+    values = pd.to_numeric(sensor_df["reading_value"], errors="coerce").astype(np.float64)
+    if "anomaly_flag" in sensor_df.columns:
+        anomalies = sensor_df["anomaly_flag"].fillna(False).astype(np.int64)
+    else:
+        anomalies = 0
+    frame = pd.DataFrame({
+        "zone": sensor_df[zone_col].astype(object),
+        "hour": _hours(sensor_df),
+        "sensor_type": sensor_df["sensor_type"].astype(object),
+        "rows": 1,
+        "count": values.notna().astype(np.int64),
+        "sum": values.fillna(0.0),
+        "sumsq": values.fillna(0.0) ** 2,
+        "min": values,
+        "max": values,
+        "anomalies": anomalies,
+    }, index=sensor_df.index)
+    return frame.groupby(CELL_KEYS, dropna=False, sort=False).agg(CELL_AGG).reset_index()
+
+
+def tweet_cells(tweets_df, zone_col="zone"):
+    """Tweet counts per zone x hour of one batch."""
+    frame = pd.DataFrame({"zone": tweets_df[zone_col].astype(object), "hour": _hours(tweets_df)})
+    return frame.groupby(["zone", "hour"], dropna=False, sort=False).size().rename("tweets").reset_index()
+
+
+class _CellTable:
+    """
+    Cells keyed by `keys`, with each aggregate column in a growable array
+    and a dict from key to row. Merging a batch's partial cells looks up
+    only the batch's keys: existing cells are folded in place with the
+    column's ufunc and new ones are appended, so the cost depends on the
+    batch, not on how many cells are already stored.
+    """
+
+    UFUNCS = {"sum": np.add, "min": np.fmin, "max": np.fmax}  # fmin/fmax skip NaN like groupby
+
+    def __init__(self, keys, agg):
+        self.keys = list(keys)
+        self.agg = dict(agg)
+        self.rows = {}
+        self.key_values = {key: [] for key in self.keys}
+        self.values = {}
+        self.size = 0
+        self._frame = None
+
+    def merge(self, partial):
+        if partial.empty:
+            return self
+        batch_keys = zip(*(partial[key].tolist() for key in self.keys))
+        positions = np.empty(len(partial), dtype=np.intp)
+        new_keys = []
+        for i, key in enumerate(batch_keys):
+            key = tuple(None if pd.isna(value) else value for value in key)
+            position = self.rows.get(key)
+            if position is None:
+                position = self.rows[key] = self.size + len(new_keys)
+                new_keys.append(key)
+            positions[i] = position
+
+        self._reserve(partial, self.size + len(new_keys))
+        for key, values in zip(self.keys, zip(*new_keys)):
+            self.key_values[key].extend(values)
+        for column, how in self.agg.items():
+            array = self.values[column]
+            batch = partial[column].to_numpy(dtype=array.dtype)
+            fresh = positions >= self.size
+            array[positions[fresh]] = batch[fresh]
+            self.UFUNCS[how].at(array, positions[~fresh], batch[~fresh])
+        self.size += len(new_keys)
+        self._frame = None
+        return self
+
+    def _reserve(self, partial, size):
+        # Arrays double when full, so appends are amortized O(1) per cell
+        for column in self.agg:
+            array = self.values.get(column)
+            if array is None:
+                dtype = np.float64 if partial[column].dtype.kind == "f" else np.int64
+                array = self.values[column] = np.empty(max(size, 16), dtype=dtype)
+            elif len(array) < size:
+                grown = np.empty(max(size, 2 * len(array)), dtype=array.dtype)
+                grown[:self.size] = array[:self.size]
+                self.values[column] = grown
+
+    def frame(self):
+        """The cells as a DataFrame (keys, then aggregates); cached until the next merge."""
+        if self._frame is None:
+            frame = pd.DataFrame({key: pd.Series(self.key_values[key], dtype=object) for key in self.keys})
+            if "hour" in frame.columns:
+                frame["hour"] = pd.to_datetime(frame["hour"])
+            for column in self.agg:
+                frame[column] = self.values[column][:self.size] if column in self.values else np.empty(0)
+            self._frame = frame
+        return self._frame
+
+    def __getstate__(self):
+        return {**self.__dict__, "_frame": None}
+
+    def __sizeof__(self):
+        size = object.__sizeof__(self) + sys.getsizeof(self.rows)
+        size += sum(array.nbytes for array in self.values.values())
+        size += sum(sys.getsizeof(values) for values in self.key_values.values())
+        if self._frame is not None:
+            size += int(self._frame.memory_usage(index=True, deep=True).sum())
+        return size
+
+
+def _dominant_type(cells, keys):
+    # sensor_type with the most rows in each group (value_counts().index[0]):
+    # rows are totalled per type across the group's cells before comparing
+    typed = cells.dropna(subset=["sensor_type"])
+    totals = typed.groupby(keys + ["sensor_type"], sort=False)["rows"].sum().reset_index()
+    top = totals.sort_values("rows", ascending=False, kind="stable").drop_duplicates(keys)
+    return top.set_index(keys)["sensor_type"]
+
+
+class ZoneAggregateStore:
+    """
+    Materialized zone x hour x sensor_type aggregates (row count, reading
+    count, sum, sum of squares, min, max, anomaly count) plus zone x hour
+    tweet counts. Batches are folded in with append_*; the summary queries
+    only read the cells, so their cost depends on zones x hours x types and
+    not on how many raw rows have been appended.
+    """
+
+    def __init__(self):
+        self._sensor_cells = _CellTable(CELL_KEYS, CELL_AGG)
+        self._tweet_cells = _CellTable(["zone", "hour"], {"tweets": "sum"})
+        self.rows_seen = 0
+
+    def __len__(self):
+        return self._sensor_cells.size
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + sys.getsizeof(self._sensor_cells) + sys.getsizeof(self._tweet_cells)
+
+    @property
+    def sensors(self):
+        """zone x hour x sensor_type cells as a DataFrame."""
+        return self._sensor_cells.frame()
+
+    @property
+    def tweets(self):
+        return self._tweet_cells.frame()
+
+    # === Updates ===
+    def append_sensors(self, sensor_df, zone_col="zone"):
+        """Adds readings (already cleaned and zoned) to the store."""
+        if len(sensor_df):
+            self._sensor_cells.merge(sensor_cells(sensor_df, zone_col))
+            self.rows_seen += len(sensor_df)
+        return self
+
+    def append_tweets(self, tweets_df, zone_col="zone"):
+        if len(tweets_df):
+            self._tweet_cells.merge(tweet_cells(tweets_df, zone_col))
+        return self
+
+    # === Queries ===
+    def zone_stats(self):
+        """Per-zone reading stats: count, mean, std, min, max, anomalies, sensor rows."""
+        cells = self.sensors.dropna(subset=["zone"])
+        cells = cells.assign(typed_rows=cells["rows"].where(cells["sensor_type"].notna(), 0))
+        zones = cells.groupby("zone").agg(
+            count=("count", "sum"),
+            sum=("sum", "sum"),
+            sumsq=("sumsq", "sum"),
+            min=("min", "min"),
+            max=("max", "max"),
+            anomalies=("anomalies", "sum"),
+            sensor_rows=("typed_rows", "sum"),
+        )
+        zones["mean"] = zones["sum"] / zones["count"].where(zones["count"] > 0)
+        zones["std"] = _std(zones["sum"], zones["sumsq"], zones["count"])
+        zones["top_sensor_type"] = _dominant_type(cells, ["zone"])
+        return zones
+
+    def hourly(self, hour_of_day=False):
+        """
+        Per zone x hour stats in the shape summarize_zone_stats takes
+        (zone, hour, avg, max_val, count, sensor_type). With hour_of_day the
+        hourly buckets are rolled up into 0-23.
+        """
+        cells = self.sensors.dropna(subset=["zone", "hour"])
+        if hour_of_day:
+            cells = cells.assign(hour=cells["hour"].dt.hour)
+            cells = cells.groupby(CELL_KEYS, dropna=False).agg(CELL_AGG).reset_index()
+        grouped = cells.groupby(["zone", "hour"]).agg(
+            count=("count", "sum"),
+            sum=("sum", "sum"),
+            sumsq=("sumsq", "sum"),
+            max_val=("max", "max"),
+        )
+        grouped["avg"] = grouped["sum"] / grouped["count"].where(grouped["count"] > 0)
+        grouped["std"] = _std(grouped["sum"], grouped["sumsq"], grouped["count"])
+        grouped["sensor_type"] = _dominant_type(cells, ["zone", "hour"])
+        return grouped[["avg", "max_val", "count", "sensor_type", "std"]].reset_index()
+
+    def tweet_counts(self):
+        return self.tweets.dropna(subset=["zone"]).groupby("zone")["tweets"].sum()
+
+    # === Persistence ===
+    def save(self, path=ZONE_STORE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path=ZONE_STORE_PATH):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def _std(total, sumsq, count):
+    # Sample standard deviation from the running sums, NaN below two readings
+    n = count.astype(np.float64)
+    var = (sumsq - total ** 2 / n.where(n > 0)) / (n - 1).where(n > 1)
+    return np.sqrt(var.clip(lower=0))